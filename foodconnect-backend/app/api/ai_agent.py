@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+import json
 
-from ..deps import get_current_user
-from ..models.user import User
-from ..services.ai import suggest_tags_from_text, recipe_from_pantry
+from ..deps import Principal, get_current_principal, ensure_admin
+from ..services.ai_cache import get_cache
+
+# services.ai (httpx) and services.images (Pillow) are imported inside the handlers, so workers
+# only pay for them once an AI request actually arrives
 
 router = APIRouter()
 
@@ -28,9 +32,11 @@ class SuggestTagsIn(BaseModel):
 
 
 @router.post("/suggest-tags", response_model=List[str])
-def suggest_tags(payload: SuggestTagsIn, current: User = Depends(get_current_user)):
+async def suggest_tags(payload: SuggestTagsIn, current: Principal = Depends(get_current_principal)):
+    from ..services.ai import suggest_tags_from_text
+
     try:
-        return suggest_tags_from_text(payload.text, max_tags=payload.max_tags or 8)
+        return await suggest_tags_from_text(payload.text, max_tags=payload.max_tags or 8)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -47,9 +53,81 @@ class PantryRecipeOut(BaseModel):
 
 
 @router.post("/pantry-recipe", response_model=PantryRecipeOut)
-def pantry_recipe(payload: PantryRecipeIn, current: User = Depends(get_current_user)):
+async def pantry_recipe(payload: PantryRecipeIn, current: Principal = Depends(get_current_principal)):
+    from ..services.ai import recipe_from_pantry
+    from ..services.images import decode_base64_images, prepare_images
+
+    images = await prepare_images(decode_base64_images(payload.images_base64))
+    try:
+        res = await recipe_from_pantry(images, payload.pantry)
+        return PantryRecipeOut(**res)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/pantry-recipe/upload", response_model=PantryRecipeOut)
+async def pantry_recipe_upload(
+    images: List[UploadFile] = File(default=[]),
+    pantry: List[str] = Form(default=[]),
+    current: Principal = Depends(get_current_principal),
+):
+    """Multipart variant of /pantry-recipe: raw image parts instead of base64 JSON."""
+    from ..services.ai import recipe_from_pantry
+    from ..services.images import prepare_images, read_uploads
+
+    prepared = await prepare_images(await read_uploads(images))
     try:
-        res = recipe_from_pantry(payload.images_base64, payload.pantry)
+        res = await recipe_from_pantry(prepared, pantry)
         return PantryRecipeOut(**res)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post(
+    "/pantry-recipe/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def pantry_recipe_stream(payload: PantryRecipeIn, current: Principal = Depends(get_current_principal)):
+    """Server-Sent Events variant of /pantry-recipe.
+
+    Emits `title`, `ingredient` and `step` events as the model produces them, then one `recipe` event
+    carrying the validated PantryRecipeOut (or an `error` event).
+    """
+    from ..services.ai import stream_recipe_from_pantry
+    from ..services.images import decode_base64_images, prepare_images
+
+    images = await prepare_images(decode_base64_images(payload.images_base64))
+
+    async def events():
+        try:
+            async for event, data in stream_recipe_from_pantry(images, payload.pantry):
+                if event == "recipe":
+                    data = PantryRecipeOut(**data).model_dump()
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/cache/stats")
+def ai_cache_stats(current: Principal = Depends(get_current_principal)):
+    ensure_admin(current)
+    from ..services.ai import coalescing_stats
+
+    return {**get_cache().stats(), "coalescing": coalescing_stats()}
+
+
+@router.delete("/cache")
+async def purge_ai_cache(kind: Optional[str] = None, current: Principal = Depends(get_current_principal)):
+    ensure_admin(current)
+    return await get_cache().purge(kind)
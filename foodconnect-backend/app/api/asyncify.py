@@ -0,0 +1,83 @@
+"""Async variants of the API routers (enabled with FC_ASYNC_DB).
+
+The handlers in this package are written once, against a sync ``Session``. ``asyncify`` re-registers
+each route with an ``async def`` endpoint that receives an ``AsyncSession`` and runs the original
+handler body through ``AsyncSession.run_sync``: the ORM code is unchanged, but every round trip goes
+through the async driver on the event loop instead of parking a threadpool worker on the socket.
+"""
+import functools
+import inspect
+
+from fastapi import APIRouter, Depends
+from fastapi.routing import APIRoute
+
+from ..database import get_async_db, get_db
+from ..deps import get_current_principal, get_current_principal_async, get_current_user, get_current_user_async
+from ..read_routing import get_read_db, get_read_db_async
+
+_ASYNC_DEPENDENCIES = {
+    get_db: get_async_db,
+    get_read_db: get_read_db_async,
+    get_current_user: get_current_user_async,
+    get_current_principal: get_current_principal_async,
+}
+
+
+def _async_endpoint(endpoint):
+    sig = inspect.signature(endpoint)
+    params = []
+    db_param = None
+    for p in sig.parameters.values():
+        dep = getattr(p.default, "dependency", None)
+        if dep in _ASYNC_DEPENDENCIES:
+            p = p.replace(default=Depends(_ASYNC_DEPENDENCIES[dep]), annotation=inspect.Parameter.empty)
+            if dep in (get_db, get_read_db):
+                db_param = p.name
+        params.append(p)
+
+    if db_param is not None:
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            db = kwargs.pop(db_param)
+            return await db.run_sync(lambda session: endpoint(**{db_param: session}, **kwargs))
+    elif inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            return await endpoint(**kwargs)
+    else:
+        # No DB work of its own (e.g. AI calls); only its auth dependency goes async
+        @functools.wraps(endpoint)
+        def wrapper(**kwargs):
+            return endpoint(**kwargs)
+
+    wrapper.__signature__ = sig.replace(parameters=params)
+    return wrapper
+
+
+def asyncify(router: APIRouter) -> APIRouter:
+    """Return a copy of ``router`` whose DB-backed endpoints run on an AsyncSession."""
+    out = APIRouter()
+    for r in router.routes:
+        if not isinstance(r, APIRoute):
+            out.routes.append(r)
+            continue
+        out.add_api_route(
+            r.path,
+            _async_endpoint(r.endpoint),
+            methods=r.methods,
+            response_model=r.response_model,
+            status_code=r.status_code,
+            tags=r.tags,
+            dependencies=r.dependencies,
+            summary=r.summary,
+            description=r.description,
+            response_description=r.response_description,
+            responses=r.responses,
+            deprecated=r.deprecated,
+            operation_id=r.operation_id,
+            include_in_schema=r.include_in_schema,
+            response_class=r.response_class,
+            name=r.name,
+            openapi_extra=r.openapi_extra,
+        )
+    return out
@@ -1,42 +1,84 @@
+from typing import Optional, Tuple
+import uuid
+
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import update
+from starlette.concurrency import run_in_threadpool
 
-from ..database import get_db
+from .. import database
 from ..models.user import User, UserRole
 from ..schemas import UserCreate, UserRead, LoginIn, TokenOut
-from ..security import hash_password, verify_password, create_access_token
+from ..security import hash_password_async, verify_and_update_password_async, create_access_token
 from ..deps import get_current_user
 
 router = APIRouter()
 
+# Signup and login are async and do their DB work in the short helpers below, each on its own session
+# in the threadpool. While bcrypt runs in the hashing pool the request holds neither a threadpool
+# worker nor a pooled connection, so a login storm cannot starve other endpoints of either.
+
+
+def _email_taken(email: str) -> bool:
+    with database.SessionLocal() as db:
+        return db.query(User.id).filter(User.email == email).first() is not None
+
+
+def _create_user(payload: UserCreate, hashed_password: str) -> TokenOut:
+    with database.SessionLocal() as db:
+        user = User(
+            email=payload.email,
+            full_name=payload.full_name,
+            hashed_password=hashed_password,
+            role=payload.role,
+            campus_id=payload.campus_id,
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return TokenOut(access_token=create_access_token(str(user.id)), user=UserRead.model_validate(user))
+
+
+def _credentials(email: str) -> Optional[Tuple[UserRead, str]]:
+    with database.SessionLocal() as db:
+        user = db.query(User).filter(User.email == email).first()
+        if not user or not user.hashed_password:
+            return None
+        return UserRead.model_validate(user), user.hashed_password
+
+
+def _store_rehash(user_id: uuid.UUID, old_hash: str, new_hash: str) -> None:
+    with database.SessionLocal() as db:
+        # Only if the password was not changed while we were verifying
+        db.execute(
+            update(User)
+            .where(User.id == user_id, User.hashed_password == old_hash)
+            .values(hashed_password=new_hash)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
 
 @router.post("/signup", response_model=TokenOut)
-def signup(payload: UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == payload.email).first()
-    if existing:
+async def signup(payload: UserCreate):
+    if await run_in_threadpool(_email_taken, payload.email):
         raise HTTPException(status_code=400, detail="Email already registered")
-    user = User(
-        email=payload.email,
-        full_name=payload.full_name,
-        hashed_password=hash_password(payload.password),
-        role=payload.role,
-        campus_id=payload.campus_id,
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    token = create_access_token(str(user.id))
-    return TokenOut(access_token=token, user=UserRead.model_validate(user))
+    hashed_password = await hash_password_async(payload.password)
+    return await run_in_threadpool(_create_user, payload, hashed_password)
 
 
 @router.post("/login", response_model=TokenOut)
-def login(payload: LoginIn, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).first()
-    if not user or not user.hashed_password or not verify_password(payload.password, user.hashed_password):
+async def login(payload: LoginIn):
+    found = await run_in_threadpool(_credentials, payload.email)
+    if found is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    user, hashed_password = found
+    ok, new_hash = await verify_and_update_password_async(payload.password, hashed_password)
+    if not ok:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    token = create_access_token(str(user.id))
-    return TokenOut(access_token=token, user=UserRead.model_validate(user))
+    if new_hash:
+        # bcrypt cost changed since this hash was made; store the upgraded one
+        await run_in_threadpool(_store_rehash, user.id, hashed_password, new_hash)
+    return TokenOut(access_token=create_access_token(str(user.id)), user=user)
 
 
 @router.get("/me", response_model=UserRead)
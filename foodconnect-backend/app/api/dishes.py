@@ -1,23 +1,65 @@
-from typing import List, Optional
+import heapq
+from typing import List, Literal, Optional
 import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
-from sqlalchemy import select, func
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.orm import Query as OrmQuery, Session
+from sqlalchemy import and_, func, or_, select
 
-from ..database import get_db
+from ..cache import LRUCache, MISSING
+from ..config import get_settings
+from .. import recommendations
+from ..database import get_db, track_committed_writes
+from ..geo import bounding_box, cover_ranges, haversine_m, parse_point
+from ..http_cache import cached_response, strong_etag
+from ..models.campus import Campus
 from ..models.dish import Dish
 from ..models.dish_image import DishImage
 from ..models.tag import Tag
 from ..models.dish_tag import DishTag
-from ..models.user import User
-from ..models.rating import Rating
 from ..schemas import DishCreate, DishRead
-from ..deps import get_current_user
+from ..deps import Principal, get_current_principal
+from ..services.search import search_backend
+from ..rating_stats import average
+from ..pagination import keyset, score_keyset, set_next_cursor
+from ..read_routing import get_read_db, primary_session
+from ..serialization import dumps, json_response
 
 
 router = APIRouter()
 
+_settings = get_settings()
+# Serialized DishRead bodies by dish id, each stored with the row version it was built from
+_detail_cache = LRUCache(_settings.dish_cache_max_entries, max_bytes=_settings.dish_cache_max_bytes)
+# Bumped whenever a commit touches dish images or tags, which do not change the dish row itself
+_media_generation = 0
+# Stock changes on every order, so clients must revalidate (cheaply, via ETag) before reuse
+_DETAIL_CACHE_CONTROL = "no-cache"
+# Largest ?near= search circle; bigger ones would cover too many grid cells to stay a range lookup
+_MAX_RADIUS_M = 50_000
+# ?near= ranks in Python, keeping the nearest offset + limit of the circle's dishes in a heap
+_MAX_NEAR_LIMIT = 100
+_MAX_NEAR_WINDOW = 1_000
+
+
+def _invalidate_media(dish_ids: set) -> None:
+    global _media_generation
+    _media_generation += 1
+    for dish_id in dish_ids:
+        _detail_cache.delete(dish_id)
+
+
+track_committed_writes(lambda obj: (obj.dish_id,) if isinstance(obj, (DishImage, DishTag)) else (), _invalidate_media)
+
+
+def _row_version(d: Dish) -> tuple:
+    """Everything in DishRead that changes after creation without an images/tags write.
+
+    Rating and stock UPDATEs also refresh updated_at, but SQLite stores it at second resolution,
+    so the counters they touch are part of the version too.
+    """
+    return (d.updated_at, d.available, d.available_qty, d.rating_sum, d.rating_count)
+
 
 def _collect_images_and_tags(db: Session, dish_ids: list[uuid.UUID]):
     images_map: dict[uuid.UUID, list[str]] = {d: [] for d in dish_ids}
@@ -39,100 +81,245 @@ def _collect_images_and_tags(db: Session, dish_ids: list[uuid.UUID]):
     return images_map, tags_map
 
 
-def _collect_rating_stats(db: Session, dish_ids: list[uuid.UUID]):
-    avg_map: dict[uuid.UUID, float] = {d: 0.0 for d in dish_ids}
-    cnt_map: dict[uuid.UUID, int] = {d: 0 for d in dish_ids}
-    if not dish_ids:
-        return avg_map, cnt_map
-    rows = (
-        db.query(Rating.dish_id, func.avg(Rating.score), func.count(Rating.id))
-        .filter(Rating.dish_id.in_(dish_ids))
-        .group_by(Rating.dish_id)
-        .all()
+# Columns behind DishRead, selected as plain tuples on the list path
+_READ_COLUMNS = (
+    Dish.id,
+    Dish.cook_id,
+    Dish.title,
+    Dish.description,
+    Dish.price,
+    Dish.currency,
+    Dish.available,
+    Dish.available_qty,
+    Dish.prep_time_minutes,
+    Dish.pickup_location,
+    Dish.campus_id,
+    Dish.latitude,
+    Dish.longitude,
+    Dish.rating_sum,
+    Dish.rating_count,
+    Dish.rating_avg,
+    Dish.created_at,
+)
+
+
+def _dish_dict(d, images: list[str], tags: list[str], distance_m: Optional[float] = None) -> dict:
+    """DishRead as a plain dict (see app/serialization.py); ``d`` is a Dish or a _READ_COLUMNS row."""
+    return {
+        "id": d.id,
+        "cook_id": d.cook_id,
+        "title": d.title,
+        "description": d.description,
+        "price": float(d.price),
+        "currency": d.currency,
+        "available": d.available,
+        "available_qty": d.available_qty,
+        "prep_time_minutes": d.prep_time_minutes,
+        "pickup_location": d.pickup_location,
+        "campus_id": d.campus_id,
+        "latitude": d.latitude,
+        "longitude": d.longitude,
+        "images": images,
+        "tags": tags,
+        "avg_rating": average(d.rating_sum, d.rating_count),
+        "rating_count": d.rating_count or 0,
+        "distance_m": distance_m,
+        "created_at": d.created_at,
+    }
+
+
+def _load_dict(db: Session, d: Dish) -> dict:
+    imgs, tmap = _collect_images_and_tags(db, [d.id])
+    return _dish_dict(d, imgs[d.id], tmap[d.id])
+
+
+def _parse_tags(tags: Optional[str]) -> list[str]:
+    seen: dict[str, None] = {}
+    for t in (tags.split(",") if tags else []):
+        t = t.strip().lower()
+        if t:
+            seen[t] = None
+    return list(seen)
+
+
+def _dishes_with_all_tags(tag_names: list[str]):
+    """Relational division over dish_tags: ids of dishes carrying every requested tag."""
+    lowered = func.lower(Tag.name)
+    return (
+        select(DishTag.dish_id)
+        .join(Tag, Tag.id == DishTag.tag_id)
+        .where(lowered.in_(tag_names))
+        .group_by(DishTag.dish_id)
+        .having(func.count(func.distinct(lowered)) == len(tag_names))
     )
-    for d_id, avg_, cnt in rows:
-        avg_map[d_id] = float(avg_ or 0)
-        cnt_map[d_id] = int(cnt or 0)
-    return avg_map, cnt_map
+
+
+def _filtered(
+    query: OrmQuery,
+    db: Session,
+    campus_id: Optional[uuid.UUID],
+    q: Optional[str],
+    requested_tags: list[str],
+    min_rating: Optional[float],
+) -> OrmQuery:
+    if campus_id:
+        query = query.filter(Dish.campus_id == campus_id)
+    if q:
+        # Full-text match ordered by relevance; created_at only breaks ties
+        query = search_backend(db).apply(query, q)
+    if requested_tags:
+        query = query.filter(Dish.id.in_(_dishes_with_all_tags(requested_tags)))
+    if min_rating is not None:
+        # A range on the stored average; rating_count keeps min_rating=0 from matching unrated dishes
+        query = query.filter(Dish.rating_avg >= min_rating, Dish.rating_count > 0)
+    return query
+
+
+def _nearby(query: OrmQuery, lat: float, lon: float, radius_m: float, limit: int, offset: int) -> list[tuple[float, uuid.UUID]]:
+    """(distance, id) of the nearest available dishes within radius_m, for a query over (id, latitude, longitude).
+
+    The geohash cells covering the circle become index range scans; the bounding box and then the
+    exact haversine distance drop the cell corners outside it. ``available`` is repeated inside each
+    cell's term so every term is a full (available, geohash range) seek; as a lone top-level equality
+    it lets the planner prefer the feed indexes and walk every available dish.
+    """
+    cells = [
+        and_(Dish.available.is_(True), Dish.geohash >= lo, *([Dish.geohash < hi] if hi is not None else []))
+        for lo, hi in cover_ranges(lat, lon, radius_m)
+    ]
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_m)
+    query = query.order_by(None).filter(or_(*cells), Dish.latitude.between(min_lat, max_lat))
+    if min_lon >= -180 and max_lon <= 180:
+        query = query.filter(Dish.longitude.between(min_lon, max_lon))
+    within = (
+        (dist, r.id)
+        for r in query
+        if (dist := haversine_m(lat, lon, r.latitude, r.longitude)) <= radius_m
+    )
+    return heapq.nsmallest(offset + limit, within)[offset:]
 
 
 @router.get("/", response_model=List[DishRead])
 def list_dishes(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     campus_id: Optional[uuid.UUID] = None,
     q: Optional[str] = None,
     tags: Optional[str] = Query(None, description="comma-separated tags"),
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    sort: Literal["recent", "rating"] = "recent",
+    near: Optional[str] = Query(None, description="lat,lon: only dishes within radius_m of this point, nearest first"),
+    radius_m: float = Query(2000, gt=0, le=_MAX_RADIUS_M),
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = Query(None, description="opaque token from the X-Next-Cursor header"),
 ):
-    query = db.query(Dish).filter(Dish.available.is_(True))
-    if campus_id:
-        query = query.filter(Dish.campus_id == campus_id)
-    if q:
-        like = f"%{q.lower()}%"
-        query = query.filter((Dish.title.ilike(like)) | (Dish.description.ilike(like)))
-    rows = query.order_by(Dish.created_at.desc()).limit(limit).offset(offset).all()
-    ids = [r.id for r in rows]
-    images_map, tags_map = _collect_images_and_tags(db, ids)
-    avg_map, cnt_map = _collect_rating_stats(db, ids)
-    requested_tags = [t.strip().lower() for t in (tags.split(",") if tags else []) if t.strip()]
-    out: list[DishRead] = []
-    for d in rows:
-        current_tags = tags_map.get(d.id, [])
-        if requested_tags and not set(requested_tags).issubset({t.lower() for t in current_tags}):
-            continue
-        out.append(
-            DishRead(
-                id=d.id,
-                cook_id=d.cook_id,
-                title=d.title,
-                description=d.description,
-                price=float(d.price),
-                currency=d.currency,
-                available=d.available,
-                available_qty=d.available_qty,
-                prep_time_minutes=d.prep_time_minutes,
-                pickup_location=d.pickup_location,
-                campus_id=d.campus_id,
-                images=images_map.get(d.id, []),
-                tags=current_tags,
-                avg_rating=avg_map.get(d.id, 0.0),
-                rating_count=cnt_map.get(d.id, 0),
-                created_at=d.created_at,
+    point = None
+    if near:
+        try:
+            point = parse_point(near)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="near must be 'lat,lon' in degrees")
+    by_recency = sort == "recent" and not q and point is None
+    # sort=rating replaces search relevance too, so its (rating_avg, id) order pages with or without q
+    by_rating = sort == "rating" and point is None
+    if cursor and not (by_recency or by_rating):
+        raise HTTPException(status_code=400, detail="cursor is not supported with near, or with q unless sort=rating")
+    if point is not None:
+        if sort == "rating":
+            raise HTTPException(status_code=400, detail="sort=rating is not supported with near; results are nearest first")
+        if not 1 <= limit <= _MAX_NEAR_LIMIT or offset < 0 or offset + limit > _MAX_NEAR_WINDOW:
+            raise HTTPException(
+                status_code=400,
+                detail=f"with near, limit must be 1-{_MAX_NEAR_LIMIT} and offset + limit at most {_MAX_NEAR_WINDOW}",
             )
+    requested_tags = _parse_tags(tags)
+
+    if point is not None:
+        located = db.query(Dish.id, Dish.latitude, Dish.longitude)
+        hits = _nearby(_filtered(located, db, campus_id, q, requested_tags, min_rating), *point, radius_m, limit, offset)
+        by_id = {r.id: r for r in db.query(*_READ_COLUMNS).filter(Dish.id.in_([i for _, i in hits]))} if hits else {}
+        images_map, tags_map = _collect_images_and_tags(db, list(by_id))
+        return json_response(
+            [_dish_dict(by_id[i], images_map[i], tags_map[i], round(dist, 1)) for dist, i in hits if i in by_id]
         )
-    return out
+
+    query = _filtered(db.query(*_READ_COLUMNS).filter(Dish.available.is_(True)), db, campus_id, q, requested_tags, min_rating)
+    if by_rating:
+        # Best first along ix_dishes_available_rating_avg_id; unrated dishes (rating_avg 0) come last
+        query = score_keyset(query.order_by(None), Dish.rating_avg, Dish.id, cursor)
+    else:
+        query = keyset(query, Dish.created_at, Dish.id, cursor)
+    rows = query.limit(limit).offset(offset).all()
+    ids = [r.id for r in rows]
+    images_map, tags_map = _collect_images_and_tags(db, ids)
+    response = json_response([_dish_dict(d, images_map[d.id], tags_map[d.id]) for d in rows])
+    if by_recency:
+        set_next_cursor(response, rows, limit)
+    elif by_rating:
+        set_next_cursor(response, rows, limit, key="rating_avg")
+    return response
+
+
+@router.get("/for-you", response_model=List[DishRead])
+def dishes_for_you(
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """Available dishes similar to what the user rated highly or ordered, best first (see
+    app/recommendations.py). Users without usable history get the newest-first feed."""
+    # Headroom for recommended dishes that are no longer available
+    ranked = recommendations.for_user(db, current_user.id, 2 * limit)
+    rows = []
+    if ranked:
+        # Availability is checked here, not in SQL: next to the id list it steers SQLite onto the feed index
+        by_id = {r.id: r for r in db.query(*_READ_COLUMNS).filter(Dish.id.in_([i for i, _ in ranked])) if r.available}
+        rows = [by_id[i] for i, _ in ranked if i in by_id][:limit]
+    if not rows:
+        rows = db.query(*_READ_COLUMNS).filter(Dish.available.is_(True)).order_by(Dish.created_at.desc(), Dish.id.desc()).limit(limit).all()
+    images_map, tags_map = _collect_images_and_tags(db, [r.id for r in rows])
+    return json_response([_dish_dict(d, images_map[d.id], tags_map[d.id]) for d in rows])
 
 
 @router.get("/{dish_id}", response_model=DishRead)
-def get_dish(dish_id: uuid.UUID, db: Session = Depends(get_db)):
+def get_dish(dish_id: uuid.UUID, request: Request, db: Session = Depends(get_read_db)):
     d = db.query(Dish).filter(Dish.id == dish_id).first()
     if not d:
         raise HTTPException(status_code=404, detail="Dish not found")
-    imgs, tmap = _collect_images_and_tags(db, [d.id])
-    avg_map, cnt_map = _collect_rating_stats(db, [d.id])
-    return DishRead(
-        id=d.id,
-        cook_id=d.cook_id,
-        title=d.title,
-        description=d.description,
-        price=float(d.price),
-        currency=d.currency,
-        available=d.available,
-        available_qty=d.available_qty,
-        prep_time_minutes=d.prep_time_minutes,
-        pickup_location=d.pickup_location,
-        campus_id=d.campus_id,
-        images=imgs.get(d.id, []),
-        tags=tmap.get(d.id, []),
-        avg_rating=avg_map.get(d.id, 0.0),
-        rating_count=cnt_map.get(d.id, 0),
-        created_at=d.created_at,
-    )
+    version = _row_version(d)
+    entry = _detail_cache.get(dish_id)
+    if entry is MISSING or entry[0] != version:
+        generation = _media_generation
+        # Built from the primary: images/tags a lagging replica returns would otherwise stay cached
+        # under the current row version until the next change to the dish
+        with primary_session(db) as source:
+            if source is not db:
+                d = source.query(Dish).filter(Dish.id == dish_id).first()
+                if not d:
+                    raise HTTPException(status_code=404, detail="Dish not found")
+                version = _row_version(d)
+            body = dumps(_load_dict(source, d))
+        entry = (version, body, strong_etag(body))
+        _detail_cache.set(dish_id, entry, weight=len(body))
+        if _media_generation != generation:
+            # An images/tags commit landed while we were reading; don't keep what may predate it
+            _detail_cache.delete(dish_id)
+    _, body, etag = entry
+    # No Last-Modified: at HTTP-date resolution If-Modified-Since would 304 a change made within the
+    # same second. The ETag follows every version.
+    return cached_response(request, body, etag, _DETAIL_CACHE_CONTROL)
 
 
 @router.post("/", response_model=DishRead, status_code=status.HTTP_201_CREATED)
-def create_dish(payload: DishCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def create_dish(payload: DishCreate, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
+    if (payload.latitude is None) != (payload.longitude is None):
+        raise HTTPException(status_code=400, detail="latitude and longitude must be given together")
+    campus_id = payload.campus_id or current_user.campus_id
+    latitude, longitude = payload.latitude, payload.longitude
+    if latitude is None and campus_id:
+        campus = db.get(Campus, campus_id)
+        if campus is not None:
+            latitude, longitude = campus.latitude, campus.longitude
     d = Dish(
         cook_id=current_user.id,
         title=payload.title,
@@ -143,7 +330,9 @@ def create_dish(payload: DishCreate, db: Session = Depends(get_db), current_user
         available_qty=payload.available_qty,
         prep_time_minutes=payload.prep_time_minutes,
         pickup_location=payload.pickup_location,
-        campus_id=payload.campus_id or current_user.campus_id,
+        campus_id=campus_id,
+        latitude=latitude,
+        longitude=longitude,
     )
     db.add(d)
     db.flush()
@@ -166,5 +355,6 @@ def create_dish(payload: DishCreate, db: Session = Depends(get_db), current_user
                 tag_map[name] = tag
             db.add(DishTag(dish_id=d.id, tag_id=tag.id))
 
+    search_backend(db).index_dish(db, d)
     db.commit()
-    return get_dish(d.id, db)
+    return json_response(_load_dict(db, d), status_code=status.HTTP_201_CREATED)
@@ -1,19 +1,82 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from pydantic import TypeAdapter
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..cache import VersionedCache
+from ..config import get_settings
+from ..database import pool_stats, track_committed_writes
+from ..deps import Principal, ensure_admin, get_current_principal
+from ..read_routing import get_read_db, primary_session, replica_stats
+from ..http_cache import cached_response, strong_etag
 from ..models.campus import Campus
 from ..models.tag import Tag
 from ..schemas import Campus as CampusSchema
 
 router = APIRouter()
 
+_settings = get_settings()
+# Serialized /campuses and /tags bodies; bumped on commit of any write to those tables
+_cache = VersionedCache(ttl=_settings.meta_cache_ttl_seconds)
+_CACHED_MODELS = {Campus: "campuses", Tag: "tags"}
+
+_campuses_adapter = TypeAdapter(list[CampusSchema])
+_tags_adapter = TypeAdapter(list[str])
+
+
+def _bump(names: set) -> None:
+    for name in names:
+        _cache.bump(name)
+
+
+_mark_write = track_committed_writes(
+    lambda obj: (_CACHED_MODELS[type(obj)],) if type(obj) in _CACHED_MODELS else (), _bump
+)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_meta_writes(state) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        mapper = state.bind_mapper
+        name = _CACHED_MODELS.get(mapper.class_) if mapper is not None else None
+        if name:
+            _mark_write(state.session, name)
+
+
+def _serve(request: Request, db: Session, name: str, load):
+    entry = _cache.get(name)
+    if entry is None:
+        version = _cache.version(name)
+        # Filled from the primary: a lagging replica's list would otherwise be cached as this version
+        with primary_session(db) as source:
+            body = load(source)
+        entry = _cache.put(name, version, body, strong_etag(body))
+    return cached_response(request, entry.body, entry.etag, f"public, max-age={_settings.meta_cache_max_age}")
+
 
 @router.get("/campuses", response_model=list[CampusSchema])
-def list_campuses(db: Session = Depends(get_db)):
-    return db.query(Campus).order_by(Campus.name).all()
+def list_campuses(request: Request, db: Session = Depends(get_read_db)):
+    return _serve(
+        request,
+        db,
+        "campuses",
+        lambda source: _campuses_adapter.dump_json(
+            _campuses_adapter.validate_python(source.query(Campus).order_by(Campus.name).all(), from_attributes=True)
+        ),
+    )
 
 
 @router.get("/tags", response_model=list[str])
-def list_tags(db: Session = Depends(get_db)):
-    return [t.name for t in db.query(Tag).order_by(Tag.name).all()]
+def list_tags(request: Request, db: Session = Depends(get_read_db)):
+    return _serve(
+        request,
+        db,
+        "tags",
+        lambda source: _tags_adapter.dump_json([t.name for t in source.query(Tag).order_by(Tag.name).all()]),
+    )
+
+
+@router.get("/db/pool")
+def db_pool_stats(current: Principal = Depends(get_current_principal)):
+    ensure_admin(current)
+    return {"pools": pool_stats(), "replicas": replica_stats()}
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.orm import Session, selectinload
 from typing import Optional, List, Literal
 import uuid
 
@@ -7,61 +8,121 @@ from ..database import get_db
 from ..models.order import Order, OrderStatus
 from ..models.order_item import OrderItem
 from ..models.dish import Dish
-from ..models.user import User
-from ..schemas import OrderCreate, OrderRead, OrderItemRead, OrderScheduleUpdate
-from ..deps import get_current_user
+from ..schemas import OrderCreate, OrderRead, OrderScheduleUpdate
+from ..deps import Principal, get_current_principal
+from ..pagination import keyset, set_next_cursor
+from ..serialization import json_response
+from .. import inventory, recommendations
 
 router = APIRouter()
 
 
+# Columns behind OrderRead / OrderItemRead, selected as plain tuples (see app/serialization.py)
+_ORDER_COLUMNS = (
+    Order.id,
+    Order.buyer_id,
+    Order.cook_id,
+    Order.status,
+    Order.total,
+    Order.currency,
+    Order.scheduled_pickup,
+    Order.pickup_notes,
+    Order.pickup_location,
+    Order.created_at,
+)
+_ITEM_COLUMNS = (
+    OrderItem.order_id,
+    OrderItem.id,
+    OrderItem.dish_id,
+    OrderItem.quantity,
+    OrderItem.unit_price,
+    OrderItem.total_price,
+    OrderItem.special_instructions,
+)
+
+
+def _order_dicts(db: Session, rows) -> list[dict]:
+    """OrderRead-shaped dicts for ``rows``, with every order's items fetched in one query."""
+    items: dict[uuid.UUID, list[dict]] = {r.id: [] for r in rows}
+    if items:
+        for i in db.query(*_ITEM_COLUMNS).filter(OrderItem.order_id.in_(items)):
+            items[i.order_id].append(
+                {
+                    "id": i.id,
+                    "dish_id": i.dish_id,
+                    "quantity": i.quantity,
+                    "unit_price": float(i.unit_price),
+                    "total_price": float(i.total_price),
+                    "special_instructions": i.special_instructions,
+                }
+            )
+    return [
+        {
+            "id": o.id,
+            "buyer_id": o.buyer_id,
+            "cook_id": o.cook_id,
+            "status": o.status,
+            "total": float(o.total),
+            "currency": o.currency,
+            "scheduled_pickup": o.scheduled_pickup,
+            "pickup_notes": o.pickup_notes,
+            "pickup_location": o.pickup_location,
+            "items": items[o.id],
+            "created_at": o.created_at,
+        }
+        for o in rows
+    ]
+
+
 @router.get("/", response_model=List[OrderRead])
 def list_orders(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     as_: Literal["buyer", "cook"] = Query("buyer", alias="as"),
     status: Optional[OrderStatus] = None,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = Query(None, description="opaque token from the X-Next-Cursor header"),
 ):
-    query = db.query(Order)
+    query = db.query(*_ORDER_COLUMNS)
     if as_ == "buyer":
         query = query.filter(Order.buyer_id == current_user.id)
     else:
         query = query.filter(Order.cook_id == current_user.id)
     if status:
         query = query.filter(Order.status == status)
-    rows = query.order_by(Order.created_at.desc()).limit(limit).offset(offset).all()
-    return [get_order(o.id, db, current_user) for o in rows]
+    rows = keyset(query, Order.created_at, Order.id, cursor).limit(limit).offset(offset).all()
+    response = json_response(_order_dicts(db, rows))
+    set_next_cursor(response, rows, limit)
+    return response
 
 
 @router.get("/{order_id}", response_model=OrderRead)
-def get_order(order_id: uuid.UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    o = db.query(Order).filter(Order.id == order_id).first()
+def get_order(order_id: uuid.UUID, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
+    o = db.query(*_ORDER_COLUMNS).filter(Order.id == order_id).first()
     if not o:
         raise HTTPException(status_code=404, detail="Order not found")
-    items = db.query(OrderItem).filter(OrderItem.order_id == o.id).all()
-    return OrderRead(
-        id=o.id,
-        buyer_id=o.buyer_id,
-        cook_id=o.cook_id,
-        status=o.status,
-        total=float(o.total),
-        currency=o.currency,
-        scheduled_pickup=o.scheduled_pickup,
-        pickup_notes=o.pickup_notes,
-        pickup_location=o.pickup_location,
-        items=[OrderItemRead.model_validate(i) for i in items],
-        created_at=o.created_at,
-    )
+    return json_response(_order_dicts(db, [o])[0])
 
 
 @router.post("/", response_model=OrderRead)
-def create_order(payload: OrderCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def create_order(payload: OrderCreate, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
     if not payload.items:
         raise HTTPException(status_code=400, detail="Empty order")
-    first_dish = db.query(Dish).filter(Dish.id == payload.items[0].dish_id).first()
-    if not first_dish:
-        raise HTTPException(status_code=404, detail="Dish not found")
+    dish_ids = {item.dish_id for item in payload.items}
+    dishes = {d.id: d for d in db.query(Dish).filter(Dish.id.in_(dish_ids)).all()}
+    for item in payload.items:
+        if item.dish_id not in dishes:
+            raise HTTPException(status_code=404, detail=f"Dish {item.dish_id} not found")
+    first_dish = dishes[payload.items[0].dish_id]
+    quantities: dict[uuid.UUID, int] = {}
+    for item in payload.items:
+        quantities[item.dish_id] = quantities.get(item.dish_id, 0) + max(1, item.quantity or 1)
+    short = inventory.reserve(db, dishes, quantities)
+    if short is not None:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Not enough '{short.title}' available")
+    recommendations.record_order(db, current_user.id, [item.dish_id for item in payload.items])
     order = Order(
         buyer_id=current_user.id,
         cook_id=first_dish.cook_id,
@@ -75,9 +136,7 @@ def create_order(payload: OrderCreate, db: Session = Depends(get_db), current_us
     db.flush()
     total = 0.0
     for item in payload.items:
-        dish = db.query(Dish).filter(Dish.id == item.dish_id).first()
-        if not dish:
-            raise HTTPException(status_code=404, detail=f"Dish {item.dish_id} not found")
+        dish = dishes[item.dish_id]
         qty = max(1, item.quantity or 1)
         unit_price = float(dish.price)
         line_total = qty * unit_price
@@ -97,12 +156,38 @@ def create_order(payload: OrderCreate, db: Session = Depends(get_db), current_us
     return get_order(order.id, db, current_user)
 
 
+@router.post("/{order_id}/cancel", response_model=OrderRead)
+def cancel_order(order_id: uuid.UUID, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
+    o = db.query(Order).options(selectinload(Order.items)).filter(Order.id == order_id).first()
+    if not o:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if o.buyer_id != current_user.id and o.cook_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    # Conditional status flip so a double cancel can't return the stock twice
+    res = db.execute(
+        update(Order)
+        .where(Order.id == o.id, Order.status.not_in([OrderStatus.cancelled, OrderStatus.picked_up]))
+        .values(status=OrderStatus.cancelled)
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount == 0:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Order is already {o.status.value}")
+    quantities: dict[uuid.UUID, int] = {}
+    for i in o.items:
+        if i.dish_id is not None:
+            quantities[i.dish_id] = quantities.get(i.dish_id, 0) + i.quantity
+    inventory.release(db, quantities)
+    db.commit()
+    return get_order(o.id, db, current_user)
+
+
 @router.patch("/{order_id}/schedule", response_model=OrderRead)
 def schedule_order(
     order_id: uuid.UUID,
     payload: OrderScheduleUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
 ):
     o = db.query(Order).filter(Order.id == order_id).first()
     if not o:
@@ -1,25 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import uuid
 
+from .. import recommendations
 from ..database import get_db
 from ..models.rating import Rating
-from ..models.user import User
 from ..schemas import RatingCreate, RatingRead
-from ..deps import get_current_user
+from ..deps import Principal, get_current_principal
+from ..rating_stats import apply_rating
+from ..pagination import keyset, set_next_cursor
+from ..read_routing import get_read_db
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[RatingRead])
-def list_ratings(dish_id: uuid.UUID, db: Session = Depends(get_db)):
-    rows = db.query(Rating).filter(Rating.dish_id == dish_id).order_by(Rating.created_at.desc()).all()
+def list_ratings(
+    dish_id: uuid.UUID,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    limit: Optional[int] = Query(None, ge=1, description="omit to return every rating"),
+    cursor: Optional[str] = Query(None, description="opaque token from the X-Next-Cursor header"),
+):
+    query = keyset(db.query(Rating).filter(Rating.dish_id == dish_id), Rating.created_at, Rating.id, cursor)
+    if limit:
+        query = query.limit(limit)
+    rows = query.all()
+    set_next_cursor(response, rows, limit)
     return [RatingRead.model_validate(r) for r in rows]
 
 
 @router.post("/", response_model=RatingRead)
-def create_rating(payload: RatingCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def create_rating(payload: RatingCreate, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
     existing = (
         db.query(Rating)
         .filter(Rating.user_id == current_user.id, Rating.dish_id == payload.dish_id)
@@ -27,6 +40,10 @@ def create_rating(payload: RatingCreate, db: Session = Depends(get_db), current_
     )
     if existing:
         raise HTTPException(status_code=400, detail="Already rated")
+    if not apply_rating(db, payload.dish_id, payload.score):
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Dish not found")
+    recommendations.record_rating(db, current_user.id, payload.dish_id, payload.score)
     r = Rating(user_id=current_user.id, dish_id=payload.dish_id, score=payload.score, comment=payload.comment)
     db.add(r)
     db.commit()
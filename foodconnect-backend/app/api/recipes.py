@@ -1,18 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 import json
+import orjson
 
 from ..database import get_db
-from ..deps import get_current_user
-from ..models.user import User
+from ..deps import Principal, get_current_principal
 from ..models.recipe import Recipe
 from ..schemas import RecipeCreate, RecipeRead
+from ..serialization import json_response
 
 router = APIRouter()
 
 
 @router.post("/", response_model=RecipeRead)
-def create_recipe(payload: RecipeCreate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def create_recipe(payload: RecipeCreate, db: Session = Depends(get_db), current: Principal = Depends(get_current_principal)):
     r = Recipe(
         user_id=current.id,
         title=payload.title,
@@ -35,19 +36,24 @@ def create_recipe(payload: RecipeCreate, db: Session = Depends(get_db), current:
 
 
 @router.get("/me", response_model=list[RecipeRead])
-def list_my_recipes(db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    rows = db.query(Recipe).filter(Recipe.user_id == current.id).order_by(Recipe.created_at.desc()).all()
-    out = []
-    for r in rows:
-        out.append(
-            RecipeRead(
-                id=r.id,
-                user_id=r.user_id,
-                title=r.title,
-                description=r.description,
-                ingredients=json.loads(r.ingredients_json or "[]"),
-                steps=json.loads(r.steps_json or "[]"),
-                created_at=r.created_at,
-            )
-        )
-    return out
+def list_my_recipes(db: Session = Depends(get_db), current: Principal = Depends(get_current_principal)):
+    rows = (
+        db.query(Recipe.id, Recipe.user_id, Recipe.title, Recipe.description, Recipe.ingredients_json, Recipe.steps_json, Recipe.created_at)
+        .filter(Recipe.user_id == current.id)
+        .order_by(Recipe.created_at.desc())
+        .all()
+    )
+    return json_response(
+        [
+            {
+                "id": r.id,
+                "user_id": r.user_id,
+                "title": r.title,
+                "description": r.description,
+                "ingredients": orjson.loads(r.ingredients_json or "[]"),
+                "steps": orjson.loads(r.steps_json or "[]"),
+                "created_at": r.created_at,
+            }
+            for r in rows
+        ]
+    )
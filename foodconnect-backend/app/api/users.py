@@ -2,33 +2,48 @@ from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from .. import database
 from ..database import get_db
 from ..models.user import User
 from ..schemas import UserCreate, UserRead
-from ..security import hash_password
+from ..security import hash_password_async
 
 
 router = APIRouter()
 
 
+# Like auth.signup: async, with the DB work on short-lived sessions in the threadpool, so neither a
+# threadpool worker nor a pooled connection is held while bcrypt runs in the hashing pool
+
+
+def _email_taken(email: str) -> bool:
+    with database.SessionLocal() as db:
+        return db.query(User.id).filter(User.email == email).first() is not None
+
+
+def _create_user(user_in: UserCreate, hashed_password: str) -> UserRead:
+    with database.SessionLocal() as db:
+        user = User(
+            email=user_in.email,
+            full_name=user_in.full_name,
+            hashed_password=hashed_password,
+            role=user_in.role,
+            campus_id=user_in.campus_id,
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return UserRead.model_validate(user)
+
+
 @router.post("/", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def create_user(user_in: UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == user_in.email).first()
-    if existing:
+async def create_user(user_in: UserCreate):
+    if await run_in_threadpool(_email_taken, user_in.email):
         raise HTTPException(status_code=400, detail="Email already registered")
-
-    user = User(
-        email=user_in.email,
-        full_name=user_in.full_name,
-        hashed_password=hash_password(user_in.password),
-        role=user_in.role,
-        campus_id=user_in.campus_id,
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    hashed_password = await hash_password_async(user_in.password)
+    return await run_in_threadpool(_create_user, user_in, hashed_password)
 
 
 @router.get("/", response_model=List[UserRead])
@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+# Sentinel distinguishing "not cached" from a cached None
+MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with optional per-entry TTL and hit/miss/eviction counters.
+
+    With ``max_bytes`` set, entries also carry a caller-supplied weight (e.g. body length) and the
+    least recently used ones are evicted until the total fits the budget.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[Hashable, tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value or MISSING."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            value, expires, weight = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                self._bytes -= weight
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, weight: int = 0) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            if self.max_bytes is not None and weight > self.max_bytes:
+                # Would evict everything else and still not fit
+                return
+            self._data[key] = (value, expires, weight)
+            self._bytes += weight
+            while len(self._data) > self.maxsize or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                _, (_, _, w) = self._data.popitem(last=False)
+                self._bytes -= w
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+    def clear(self) -> int:
+        with self._lock:
+            n = len(self._data)
+            self._data.clear()
+            self._bytes = 0
+            return n
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class CachedBody:
+    __slots__ = ("body", "etag", "version", "expires")
+
+    def __init__(self, body: bytes, etag: str, version: int, expires: Optional[float]):
+        self.body = body
+        self.etag = etag
+        self.version = version
+        self.expires = expires
+
+
+class VersionedCache:
+    """Serialized response bodies per name, valid only while the name's version counter is unchanged.
+
+    Writers call ``bump(name)`` after committing a change. Readers snapshot ``version(name)`` *before*
+    querying and store under that version, so a load that raced a commit is never served as fresh.
+    The optional TTL bounds staleness from writes made by other processes.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl
+        self._versions: dict[str, int] = {}
+        self._entries: dict[str, CachedBody] = {}
+        self._lock = threading.Lock()
+
+    def version(self, name: str) -> int:
+        return self._versions.get(name, 0)
+
+    def bump(self, name: str) -> None:
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+            self._entries.pop(name, None)
+
+    def get(self, name: str) -> Optional[CachedBody]:
+        entry = self._entries.get(name)
+        if entry is None or entry.version != self.version(name):
+            return None
+        if entry.expires is not None and entry.expires <= time.monotonic():
+            return None
+        return entry
+
+    def put(self, name: str, version: int, body: bytes, etag: str) -> CachedBody:
+        entry = CachedBody(body, etag, version, time.monotonic() + self.ttl if self.ttl is not None else None)
+        with self._lock:
+            if version == self.version(name):
+                self._entries[name] = entry
+        return entry
@@ -7,9 +7,87 @@ class Settings(BaseSettings):
     app_name: str = "FoodConnect Backend"
     debug: bool = True
     database_url: str = "sqlite:///./app.db"
+    # Serve DB-backed routes from an AsyncSession (aiosqlite / psycopg async) instead of the threadpool
+    async_db: bool = False
+    # Defaults to database_url with its driver swapped for an async one
+    async_database_url: Optional[str] = None
+    # Comma-separated read replica URLs for GET-only routes (see app/read_routing.py); a replica that
+    # fails a connection is skipped for read_replica_retry_seconds
+    read_replica_urls: str = ""
+    read_replica_retry_seconds: float = 30.0
+    # After a client's request commits a write, its reads go to the primary for this long (0 = off)
+    read_your_writes_seconds: float = 5.0
+    # Connection pool (not used for in-memory SQLite). Recycle below the server/proxy idle timeout;
+    # -1 disables recycling
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # SQLite per-connection PRAGMAs. WAL lets readers run alongside a writer; busy_timeout makes
+    # writers wait for the lock instead of failing with "database is locked". An empty mode or
+    # 0 for the numeric ones gives SQLite's own default
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    # Prometheus text metrics at /metrics (request latency, SQL per request, pool, AI upstream).
+    # The debug header adds `Server-Timing: db;dur=<ms>;desc="<n> queries"` to every response
+    metrics_enabled: bool = True
+    metrics_debug_header: bool = False
+    # Log a warning when one request runs the same SQL statement more than this many times (0 = off)
+    n_plus_one_threshold: int = 10
     secret_key: str = "change-me"
+    # Per-process cache of verified tokens and user snapshots (id, role, campus); bounds staleness
+    # across workers, since invalidation on user update/delete is only local
+    auth_cache_ttl_seconds: float = 60.0
+    auth_cache_max_entries: int = 10000
+    # bcrypt cost factor; existing hashes are upgraded transparently on the next successful login
+    bcrypt_rounds: int = 12
+    # Password hashing process pool: None = one worker per core, 0 = hash inline (dev/tests)
+    password_hash_workers: Optional[int] = None
+    # Hash/verify calls allowed to wait for the pool before new ones get 503; None = twice the pool
+    # size, at least 8. Always kept below the DB pool (size + overflow) and the request threadpool
+    password_hash_max_queue: Optional[int] = None
     openai_api_key: Optional[str] = None
     google_api_key: Optional[str] = None
+    # Gemini HTTP client (one pooled AsyncClient per process); point the base URL at a stub for tests
+    gemini_base_url: str = "https://generativelanguage.googleapis.com/v1beta"
+    ai_http2: bool = True
+    ai_max_connections: int = 20
+    ai_max_keepalive_connections: int = 10
+    ai_keepalive_expiry: float = 30.0
+    ai_connect_timeout: float = 5.0
+    ai_timeout: float = 60.0
+    ai_tags_timeout: float = 30.0
+    ai_recipe_timeout: float = 60.0
+    # Upstream calls allowed in flight at once; extra requests wait for a slot
+    ai_max_concurrency: int = 8
+    # Tag-suggestion result cache: in-process LRU tier plus a persistent table tier
+    ai_cache_enabled: bool = True
+    ai_cache_max_entries: int = 2048
+    ai_cache_ttl_seconds: float = 3600.0
+    ai_cache_db_ttl_seconds: float = 7 * 24 * 3600.0
+    # Every N persistent writes, delete expired table rows in batches of this size (0 disables)
+    ai_cache_sweep_every: int = 100
+    ai_cache_sweep_batch: int = 500
+    # /campuses and /tags: in-process cache lifetime (bounds staleness from other workers' writes)
+    # and the Cache-Control max-age sent to clients
+    meta_cache_ttl_seconds: float = 300.0
+    meta_cache_max_age: int = 60
+    # Dish detail response cache: serialized bodies, LRU-evicted by count and total size
+    dish_cache_max_entries: int = 4096
+    dish_cache_max_bytes: int = 16 * 1024 * 1024
+    # For-you recommendations: similar dishes kept per dish in dish_neighbors (see app/recommendations.py)
+    recommender_neighbors: int = 20
+    # Pantry photo preprocessing: images are downscaled to ai_image_max_edge px and re-encoded as JPEG
+    ai_image_max_edge: int = 1024
+    ai_image_jpeg_quality: int = 80
+    # JPEGs already within max edge and under this size are forwarded as-is
+    ai_image_passthrough_bytes: int = 512 * 1024
+    ai_image_max_count: int = 6
+    ai_image_max_bytes: int = 15 * 1024 * 1024
+    ai_upload_max_bytes: int = 60 * 1024 * 1024
     # AWS-friendly generic DB fields (use FC_DATABASE_URL in most cases)
     db_user: Optional[str] = None
     db_password: Optional[str] = None
@@ -1,37 +1,353 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from contextlib import contextmanager
+from itertools import chain
+import threading
+import time
+from typing import Callable, Hashable, Iterable
 
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from . import metrics
 from .config import get_settings
 
 
 settings = get_settings()
 Base = declarative_base()
 
-engine = None
-SessionLocal = None
+# Built on first use (see get_engine / __getattr__ below), so importing the app costs no engine setup
+_engine = None
+_SessionLocal = None
+_async_engine = None
+_AsyncSessionLocal = None
+_build_lock = threading.Lock()
+
+
+class PoolMetrics:
+    """Checkout counters for one engine's pool: how often and how long requests waited for a connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        # Checkouts served by a connection beyond pool_size
+        self.overflow_checkouts = 0
+        self.overflow_peak = 0
+
+    def observe(self, pool, waited: float, ok: bool) -> None:
+        overflow = pool.overflow()
+        with self._lock:
+            if not ok:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            if overflow > 0 and pool.checkedout() > pool.size():
+                self.overflow_checkouts += 1
+            self.overflow_peak = max(self.overflow_peak, overflow)
+
+    def snapshot(self, pool) -> dict:
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "overflow_checkouts": self.overflow_checkouts,
+            "overflow_peak": self.overflow_peak,
+        }
+
+
+class _MeteredPool:
+    """Times each checkout: the wait for a free connection when the pool is exhausted, or the
+    connect time when a new one has to be opened."""
+
+    metrics: PoolMetrics
 
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.observe(self, time.perf_counter() - start, ok=False)
+            raise
+        self.metrics.observe(self, time.perf_counter() - start, ok=True)
+        return conn
 
-def _build_engine():
-    """Build a SQLAlchemy engine from DATABASE_URL (supports AWS RDS/Postgres, SQLite)."""
-    global engine, SessionLocal
-    connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
-    engine = create_engine(
-        settings.database_url,
-        echo=False,
-        future=True,
-        connect_args=connect_args,
-        pool_pre_ping=True,
+    def recreate(self):
+        # pool_pre_ping / invalidation can swap in a fresh pool; keep counting into the same metrics
+        new = super().recreate()
+        new.metrics = self.metrics
+        return new
+
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    pass
+
+
+class MeteredAsyncQueuePool(_MeteredPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _engine_kwargs(url, pool_class) -> dict:
+    """Pool options from settings. In-memory SQLite keeps SQLAlchemy's single-connection pool."""
+    kwargs = {"echo": False, "pool_pre_ping": settings.db_pool_pre_ping}
+    if _is_memory_sqlite(url):
+        return kwargs
+    kwargs.update(
+        poolclass=pool_class,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
     )
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return kwargs
+
+
+def _sqlite_pragmas() -> list[str]:
+    pragmas = []
+    if settings.sqlite_journal_mode:
+        pragmas.append(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    if settings.sqlite_synchronous:
+        pragmas.append(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    if settings.sqlite_busy_timeout_ms:
+        pragmas.append(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+    if settings.sqlite_mmap_size:
+        pragmas.append(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+    return pragmas
+
+
+def _install_sqlite_pragmas(sync_engine) -> None:
+    """Apply the configured PRAGMAs to every new DBAPI connection (they are per-connection state)."""
+    pragmas = _sqlite_pragmas()
+    if not pragmas:
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def _install_query_metrics(name: str, sync_engine) -> None:
+    """Time every statement and report it to app.metrics (per-engine totals, per-request stats)."""
+
+    # Start time rides on the per-execution context, so a statement that raises leaves nothing behind
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _started(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._fc_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _finished(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_fc_started", None)
+        if started is not None:
+            metrics.observe_query(name, statement, time.perf_counter() - started)
+
+
+# Engines whose pool checkouts are reported by pool_stats(), by name
+_metered_engines: dict = {}
+
+
+def _attach_metrics(name: str, sync_engine) -> None:
+    if isinstance(sync_engine.pool, _MeteredPool):
+        sync_engine.pool.metrics = PoolMetrics()
+        _metered_engines[name] = sync_engine
+
+
+def make_engine(url, name: str):
+    """Sync engine with the configured pool, SQLite PRAGMAs and checkout metrics."""
+    url = make_url(url)
+    connect_args = {"check_same_thread": False} if url.get_backend_name() == "sqlite" else {}
+    eng = create_engine(url, connect_args=connect_args, **_engine_kwargs(url, MeteredQueuePool))
+    if url.get_backend_name() == "sqlite":
+        _install_sqlite_pragmas(eng)
+    if settings.metrics_enabled:
+        _install_query_metrics(name, eng)
+    _attach_metrics(name, eng)
+    return eng
+
+
+def make_async_engine(url, name: str):
+    """Async counterpart of make_engine; ``url`` must already name an async driver."""
+    url = make_url(url)
+    eng = create_async_engine(url, **_engine_kwargs(url, MeteredAsyncQueuePool))
+    if url.get_backend_name() == "sqlite":
+        _install_sqlite_pragmas(eng.sync_engine)
+    if settings.metrics_enabled:
+        _install_query_metrics(name, eng.sync_engine)
+    _attach_metrics(name, eng.sync_engine)
+    return eng
+
 
+def get_engine():
+    """The primary engine, built from DATABASE_URL on first call (supports AWS RDS/Postgres, SQLite)."""
+    global _engine, _SessionLocal
+    if _engine is None:
+        with _build_lock:
+            if _engine is None:
+                eng = make_engine(settings.database_url, "sync")
+                _SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=eng)
+                _engine = eng
+    return _engine
 
-_build_engine()
+
+def get_sessionmaker() -> sessionmaker:
+    get_engine()
+    return _SessionLocal
+
+
+def async_url(url):
+    """Swap a sync driver for its async counterpart (sqlite -> aiosqlite, postgres -> psycopg async)."""
+    u = make_url(url)
+    if u.get_backend_name() == "sqlite":
+        return u.set(drivername="sqlite+aiosqlite")
+    if u.get_backend_name() == "postgresql":
+        # psycopg 3 speaks both sync and async; only psycopg2-style URLs need rewriting
+        return u.set(drivername="postgresql+psycopg")
+    return u
+
+
+def get_async_engine():
+    """The AsyncEngine used when FC_ASYNC_DB is on (None otherwise). The sync engine stays for DDL and scripts."""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None and settings.async_db:
+        with _build_lock:
+            if _async_engine is None:
+                eng = make_async_engine(settings.async_database_url or async_url(settings.database_url), "async")
+                _AsyncSessionLocal = async_sessionmaker(eng, class_=AsyncSession, autoflush=False)
+                _async_engine = eng
+    return _async_engine
+
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    get_async_engine()
+    return _AsyncSessionLocal
+
+
+_LAZY = {
+    "engine": get_engine,
+    "SessionLocal": get_sessionmaker,
+    "async_engine": get_async_engine,
+    "AsyncSessionLocal": get_async_sessionmaker,
+}
+
+
+def __getattr__(name: str):
+    # Keeps `database.engine` / `database.SessionLocal` working while deferring construction
+    if name in _LAZY:
+        return _LAZY[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_db():
     """FastAPI dependency that yields a DB session and ensures it's closed."""
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Async counterpart of get_db, used by routers when FC_ASYNC_DB is on."""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+def track_committed_writes(
+    keys_for: Callable[[object], Iterable[Hashable]], on_commit: Callable[[set], None]
+) -> Callable[[Session, Hashable], None]:
+    """Call ``on_commit(keys)`` once a transaction commits, with the keys ``keys_for`` returned for
+    every object it inserted, updated or deleted. Work that is rolled back is forgotten.
+
+    Used to invalidate in-process caches only after the change is visible to other sessions, so a
+    concurrent reader cannot re-cache the old rows as current. Returns ``mark(session, key)`` for
+    writes the flush never sees (bulk UPDATE/DELETE statements).
+    """
+    info_key = object()
+
+    def mark(session: Session, key: Hashable) -> None:
+        session.info.setdefault(info_key, set()).add(key)
+
+    def collect(session: Session, flush_context) -> None:
+        for obj in chain(session.new, session.dirty, session.deleted):
+            for key in keys_for(obj):
+                mark(session, key)
+
+    def committed(session: Session) -> None:
+        keys = session.info.pop(info_key, None)
+        if keys:
+            on_commit(keys)
+
+    def rolled_back(session: Session) -> None:
+        session.info.pop(info_key, None)
+
+    event.listen(Session, "after_flush", collect)
+    event.listen(Session, "after_commit", committed)
+    event.listen(Session, "after_rollback", rolled_back)
+    return mark
+
+
+def pool_stats() -> dict:
+    """Checkout metrics per engine (see PoolMetrics); engines on a non-metered pool are omitted."""
+    return {name: eng.pool.metrics.snapshot(eng.pool) for name, eng in _metered_engines.items()}
+
+
+class QueryCounter:
+    """Collects the SQL statements executed on an engine while active (see count_queries)."""
+
+    def __init__(self):
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(bind=None, expected: int | None = None):
+    """Count statements executed on ``bind`` (default: the app engines) inside the block.
+
+    With ``expected`` set, raise AssertionError on exit if the count differs, so callers can pin
+    the number of queries an endpoint is allowed to run::
+
+        with count_queries(expected=2):
+            client.get("/api/orders", headers=auth)
+    """
+    if bind is not None:
+        targets = [bind]
+    else:
+        async_eng = get_async_engine()
+        targets = [get_engine()] + ([async_eng.sync_engine] if async_eng is not None else [])
+        targets += [e for e in _metered_engines.values() if e not in targets]
+    counter = QueryCounter()
+    for target in targets:
+        event.listen(target, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        for target in targets:
+            event.remove(target, "before_cursor_execute", counter)
+    if expected is not None and counter.count != expected:
+        listing = "\n".join(counter.statements)
+        raise AssertionError(f"expected {expected} queries, got {counter.count}:\n{listing}")
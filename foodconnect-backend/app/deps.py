@@ -1,32 +1,148 @@
+from dataclasses import dataclass
+import hashlib
+import time
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import uuid
 
-from .database import get_db
-from .models.user import User
-from .security import decode_token
+from .cache import LRUCache, MISSING
+from .config import get_settings
+from .database import get_db, get_async_db
+from .models.user import User, UserRole
+from .security import decode_token_claims
 
 security = HTTPBearer(auto_error=True)
 
 
+@dataclass(frozen=True)
+class Principal:
+    """What most handlers need to know about the caller, without loading the ORM User."""
+
+    id: uuid.UUID
+    role: UserRole
+    campus_id: Optional[uuid.UUID] = None
+
+
+_settings = get_settings()
+# sha256(token) -> user id: skips the HS256 verify for tokens seen recently
+_token_cache = LRUCache(_settings.auth_cache_max_entries, ttl=_settings.auth_cache_ttl_seconds)
+# user id -> Principal: skips the users SELECT; dropped when the user row changes
+_principal_cache = LRUCache(_settings.auth_cache_max_entries, ttl=_settings.auth_cache_ttl_seconds)
+
+
 def get_db_session():
     return Depends(get_db)
 
 
-def get_current_user(
-    cred: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
-    token = cred.credentials
-    sub = decode_token(token)
+def invalidate_user(user_id: uuid.UUID) -> None:
+    _principal_cache.delete(user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _on_user_changed(mapper, connection, target: User) -> None:
+    invalidate_user(target.id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_bulk_user_write(state) -> None:
+    # query(User).update()/delete() bypass the mapper events above and don't say which rows changed
+    if (state.is_update or state.is_delete) and state.bind_mapper is not None and state.bind_mapper.class_ is User:
+        _principal_cache.clear()
+
+
+def auth_cache_stats() -> dict:
+    return {"tokens": _token_cache.stats(), "principals": _principal_cache.stats()}
+
+
+def _token_user_id(cred: HTTPAuthorizationCredentials) -> uuid.UUID:
+    key = hashlib.sha256(cred.credentials.encode()).hexdigest()
+    cached = _token_cache.get(key)
+    if cached is not MISSING:
+        return cached
+    claims = decode_token_claims(cred.credentials)
+    sub = claims.get("sub") if claims else None
     if not sub:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     try:
         user_id = uuid.UUID(sub)
     except ValueError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    # Never keep a token cached past its own expiry
+    ttl = _token_cache.ttl
+    if claims.get("exp") is not None:
+        ttl = min(ttl, claims["exp"] - time.time())
+    if ttl > 0:
+        _token_cache.set(key, user_id, ttl=ttl)
+    return user_id
+
+
+def _remember(user: User) -> Principal:
+    principal = Principal(id=user.id, role=user.role, campus_id=user.campus_id)
+    _principal_cache.set(user.id, principal)
+    return principal
+
+
+def _load_user(db: Session, user_id: uuid.UUID) -> User:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
+
+
+async def _load_user_async(db: AsyncSession, user_id: uuid.UUID) -> User:
+    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+
+def get_current_user(
+    cred: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+) -> User:
+    user = _load_user(db, _token_user_id(cred))
+    _remember(user)
+    return user
+
+
+async def get_current_user_async(
+    cred: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    user = await _load_user_async(db, _token_user_id(cred))
+    _remember(user)
+    return user
+
+
+def get_current_principal(
+    cred: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+) -> Principal:
+    """Like get_current_user, but served from the principal cache; the DB is only hit on a miss."""
+    user_id = _token_user_id(cred)
+    principal = _principal_cache.get(user_id)
+    if principal is MISSING:
+        principal = _remember(_load_user(db, user_id))
+    return principal
+
+
+async def get_current_principal_async(
+    cred: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    user_id = _token_user_id(cred)
+    principal = _principal_cache.get(user_id)
+    if principal is MISSING:
+        principal = _remember(await _load_user_async(db, user_id))
+    return principal
+
+
+def ensure_admin(user: User | Principal) -> None:
+    if user.role != UserRole.admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
@@ -0,0 +1,137 @@
+"""Geohash grid for nearby-dish lookups.
+
+Each dish with coordinates stores its geohash (GEOHASH_PRECISION chars, ~5 m cells). A geohash
+prefix is a grid cell, and every point inside a cell has a hash that starts with that prefix, so
+"dishes in these cells" is a handful of range scans on an ordinary B-tree index. ``cover`` picks the
+cells for a search circle; callers then refine the candidates with the exact ``haversine_m``.
+"""
+import math
+from typing import Iterator, List, Optional, Tuple
+
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_M = 6_371_008.8
+# Cells allowed in one cover; more cells = tighter fit but more OR'ed ranges per query
+MAX_COVER_CELLS = 24
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_M_PER_DEG_LAT = math.pi * EARTH_RADIUS_M / 180
+
+
+def _bits(precision: int) -> Tuple[int, int]:
+    """(lat bits, lon bits) in a geohash of ``precision`` chars; bits alternate starting with lon."""
+    total = 5 * precision
+    return total // 2, total - total // 2
+
+
+def _cell(lat: float, lon: float, lat_bits: int, lon_bits: int) -> Tuple[int, int]:
+    y = int((lat + 90.0) / 180.0 * (1 << lat_bits))
+    x = int((lon + 180.0) / 360.0 * (1 << lon_bits))
+    return min(max(y, 0), (1 << lat_bits) - 1), min(max(x, 0), (1 << lon_bits) - 1)
+
+
+def _hash(y: int, x: int, precision: int) -> str:
+    lat_bits, lon_bits = _bits(precision)
+    value = 0
+    for i in range(5 * precision):
+        if i % 2 == 0:
+            bit = (x >> (lon_bits - 1 - i // 2)) & 1
+        else:
+            bit = (y >> (lat_bits - 1 - i // 2)) & 1
+        value = (value << 1) | bit
+    return "".join(_BASE32[(value >> (5 * (precision - 1 - i))) & 31] for i in range(precision))
+
+
+def encode(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_bits, lon_bits = _bits(precision)
+    y, x = _cell(lat, lon, lat_bits, lon_bits)
+    return _hash(y, x, precision)
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in metres."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, lon: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """(min lat, max lat, min lon, max lon) enclosing the circle. Longitudes may fall outside
+    [-180, 180] when the circle crosses the antimeridian; near a pole the box spans all longitudes."""
+    dlat = radius_m / _M_PER_DEG_LAT
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat < 1e-9 or radius_m / (_M_PER_DEG_LAT * cos_lat) >= 180:
+        return min_lat, max_lat, -180.0, 180.0
+    dlon = radius_m / (_M_PER_DEG_LAT * cos_lat)
+    return min_lat, max_lat, lon - dlon, lon + dlon
+
+
+def _cover_cells(box, precision: int) -> Iterator[Tuple[int, int]]:
+    min_lat, max_lat, min_lon, max_lon = box
+    lat_bits, lon_bits = _bits(precision)
+    y0, _ = _cell(min_lat, 0.0, lat_bits, lon_bits)
+    y1, _ = _cell(max_lat, 0.0, lat_bits, lon_bits)
+    n_lon = 1 << lon_bits
+    # floor, not int(): past the antimeridian these go negative (or beyond n_lon) and wrap below
+    x0 = math.floor((min_lon + 180.0) / 360.0 * n_lon)
+    x1 = math.floor((max_lon + 180.0) / 360.0 * n_lon)
+    if x1 - x0 + 1 >= n_lon:
+        x0, x1 = 0, n_lon - 1
+    for y in range(y0, y1 + 1):
+        for x in range(x0, x1 + 1):
+            # Wrap across the antimeridian
+            yield y, x % n_lon
+
+
+def cover(lat: float, lon: float, radius_m: float) -> List[str]:
+    """Geohash prefixes whose cells together contain the circle, at the finest precision that needs
+    at most MAX_COVER_CELLS cells."""
+    box = bounding_box(lat, lon, radius_m)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_bits, lon_bits = _bits(precision)
+        rows = _cell(box[1], 0.0, lat_bits, lon_bits)[0] - _cell(box[0], 0.0, lat_bits, lon_bits)[0] + 1
+        n_lon = 1 << lon_bits
+        cols = min(math.floor((box[3] + 180.0) / 360.0 * n_lon) - math.floor((box[2] + 180.0) / 360.0 * n_lon) + 1, n_lon)
+        if rows * cols <= MAX_COVER_CELLS:
+            return sorted({_hash(y, x, precision) for y, x in _cover_cells(box, precision)})
+    return [""]
+
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest string greater than every string starting with ``prefix`` (None: no bound).
+
+    The base32 alphabet is in ASCII order, so ``prefix <= h < prefix_upper_bound(prefix)`` is
+    exactly "h starts with prefix" and can be answered from an index.
+    """
+    chars = list(prefix)
+    while chars:
+        i = _BASE32.index(chars[-1])
+        if i + 1 < len(_BASE32):
+            chars[-1] = _BASE32[i + 1]
+            return "".join(chars)
+        chars.pop()
+    return None
+
+
+def cover_ranges(lat: float, lon: float, radius_m: float) -> List[Tuple[str, Optional[str]]]:
+    """``cover`` as [lo, hi) geohash ranges (hi None = unbounded), adjacent cells merged."""
+    ranges: List[Tuple[str, Optional[str]]] = []
+    for prefix in cover(lat, lon, radius_m):
+        hi = prefix_upper_bound(prefix)
+        if ranges and ranges[-1][1] == prefix:
+            ranges[-1] = (ranges[-1][0], hi)
+        else:
+            ranges.append((prefix, hi))
+    return ranges
+
+
+def parse_point(value: str) -> Tuple[float, float]:
+    """``"lat,lon"`` -> (lat, lon); ValueError when malformed or out of range."""
+    parts = value.split(",")
+    if len(parts) != 2:
+        raise ValueError("expected lat,lon")
+    lat, lon = float(parts[0]), float(parts[1])
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        raise ValueError("coordinates out of range")
+    return lat, lon
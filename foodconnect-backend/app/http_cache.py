@@ -0,0 +1,37 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def strong_etag(body: bytes) -> str:
+    """Content-derived ETag, so every worker agrees on it for identical bytes."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 specifies for this header)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    want = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == want for tag in header.split(","))
+
+
+def cached_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    cache_control: str,
+    last_modified: Optional[str] = None,
+    media_type: str = "application/json",
+) -> Response:
+    """200 with validators, or a bodyless 304 when the client already holds this representation."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
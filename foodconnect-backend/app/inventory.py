@@ -0,0 +1,53 @@
+from typing import Mapping, Optional
+import uuid
+
+from sqlalchemy import case, update
+from sqlalchemy.orm import Session
+
+from .models.dish import Dish
+
+
+def reserve(db: Session, dishes: Mapping[uuid.UUID, Dish], quantities: Mapping[uuid.UUID, int]) -> Optional[Dish]:
+    """Take ``quantities`` portions out of stock in the caller's transaction.
+
+    Each dish with a tracked ``available_qty`` is decremented by a conditional UPDATE that only
+    matches while enough stock is left, so two buyers racing for the last portion cannot both
+    win; the row flips to unavailable when it reaches zero. Returns the first dish that could
+    not be reserved (the caller should roll back), or None on success.
+    """
+    # Stable lock order keeps concurrent multi-dish orders from deadlocking on Postgres
+    for dish_id in sorted(quantities, key=str):
+        dish = dishes[dish_id]
+        qty = quantities[dish_id]
+        if dish.available_qty is None:
+            # Untracked stock: only the availability flag applies
+            if not dish.available:
+                return dish
+            continue
+        res = db.execute(
+            update(Dish)
+            .where(Dish.id == dish_id, Dish.available.is_(True), Dish.available_qty >= qty)
+            .values(
+                available_qty=Dish.available_qty - qty,
+                available=case((Dish.available_qty - qty <= 0, False), else_=Dish.available),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if res.rowcount == 0:
+            return dish
+    return None
+
+
+def release(db: Session, quantities: Mapping[uuid.UUID, int]) -> None:
+    """Put reserved portions back (e.g. on cancellation), re-listing dishes that had sold out."""
+    for dish_id in sorted(quantities, key=str):
+        qty = quantities[dish_id]
+        db.execute(
+            update(Dish)
+            .where(Dish.id == dish_id, Dish.available_qty.is_not(None))
+            .values(
+                available_qty=Dish.available_qty + qty,
+                available=case((Dish.available_qty == 0, True), else_=Dish.available),
+            )
+            .execution_options(synchronize_session=False)
+        )
@@ -1,21 +1,40 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import sys
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from .api import api_router
-from .database import Base, engine
+from .read_routing import ReadYourWritesMiddleware
 from .config import get_settings
+from . import metrics
+from .security import shutdown_password_pool
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    try:
+        yield
+    finally:
+        # The AI stack is imported (and its client created) on first use; close it only if it was
+        ai = sys.modules.get(f"{__package__}.services.ai")
+        if ai is not None:
+            await ai.shutdown()
+        shutdown_password_pool()
 
 
 def create_app() -> FastAPI:
     settings = get_settings()
-    app = FastAPI(title=settings.app_name, debug=settings.debug)
+    app = FastAPI(title=settings.app_name, debug=settings.debug, lifespan=_lifespan)
 
-    # Create tables on startup (for dev). Use migrations in production.
-    Base.metadata.create_all(bind=engine)
+    # No DDL here: run `python -m app.migrate` before starting workers (run.sh does it for dev)
 
     # Mount API routers
     app.include_router(api_router, prefix="/api")
 
+    # Pins a client to the primary briefly after it writes (no-op without read replicas)
+    app.add_middleware(ReadYourWritesMiddleware)
+
     # CORS for development (iOS simulator / web clients)
     app.add_middleware(
         CORSMiddleware,
@@ -31,6 +50,14 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    if settings.metrics_enabled:
+        # Added last, so it is outermost and request latency includes the other middleware
+        app.add_middleware(metrics.MetricsMiddleware)
+
+        @app.get("/metrics", include_in_schema=False)
+        def prometheus_metrics():
+            return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
     @app.get("/healthz")
     def healthcheck():
         return {"status": "ok"}
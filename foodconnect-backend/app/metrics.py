@@ -0,0 +1,264 @@
+"""Request, SQL, pool and upstream-AI metrics, exposed in Prometheus text format at ``/metrics``.
+
+``MetricsMiddleware`` times each request under its route template and opens a per-request
+``RequestStats`` that the engine hooks in ``app/database.py`` add every statement to. At the end of
+the request the query count and DB time go into per-route histograms, and a statement repeated more
+than FC_N_PLUS_ONE_THRESHOLD times is logged as a likely N+1. Pool gauges are read from
+``database.pool_stats()`` at scrape time.
+
+The exposition format is small enough to write directly, so there is no client-library dependency.
+"""
+from collections import Counter
+import contextvars
+import logging
+import math
+import threading
+import time
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from .config import get_settings
+
+log = logging.getLogger(__name__)
+settings = get_settings()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+_AI_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class CounterMetric(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield from super().render()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_num(value)}"
+
+
+class HistogramMetric(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = _LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+        # label values -> [per-bucket counts (non-cumulative), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        i = 0
+        while value > self.buckets[i]:
+            i += 1
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> Iterable[str]:
+        yield from super().render()
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="%s"' % _num(bound)
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_num(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {count}"
+
+
+_registry: list = []
+
+http_requests = CounterMetric("fc_http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+http_latency = HistogramMetric("fc_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route"))
+request_queries = HistogramMetric(
+    "fc_db_queries_per_request", "SQL statements executed per HTTP request.", ("method", "route"), _QUERY_COUNT_BUCKETS
+)
+request_db_time = HistogramMetric("fc_db_time_per_request_seconds", "Time spent in SQL per HTTP request.", ("method", "route"))
+n_plus_one = CounterMetric(
+    "fc_db_repeated_statement_requests_total", "Requests that repeated one statement past the N+1 threshold.", ("method", "route")
+)
+queries = CounterMetric("fc_db_queries_total", "SQL statements executed, by engine.", ("engine",))
+query_time = CounterMetric("fc_db_query_seconds_total", "Time spent executing SQL, by engine.", ("engine",))
+ai_latency = HistogramMetric(
+    "fc_ai_upstream_duration_seconds", "Upstream AI (Gemini) call latency.", ("operation", "outcome"), _AI_BUCKETS
+)
+
+# Pool gauges/counters rendered from database.pool_stats() at scrape time: (metric, stats key, type, help)
+_POOL_SERIES = (
+    ("fc_db_pool_size", "size", "gauge", "Configured pool size."),
+    ("fc_db_pool_checked_out", "checked_out", "gauge", "Connections currently checked out."),
+    ("fc_db_pool_overflow", "overflow", "gauge", "Connections open beyond pool_size."),
+    ("fc_db_pool_checkouts_total", "checkouts", "counter", "Connection checkouts."),
+    ("fc_db_pool_timeouts_total", "timeouts", "counter", "Checkouts that timed out waiting for a connection."),
+    ("fc_db_pool_wait_seconds_total", "wait_seconds_total", "counter", "Time spent waiting for a connection."),
+)
+
+
+class RequestStats:
+    """SQL executed on behalf of one HTTP request."""
+
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: Counter = Counter()
+
+
+# Set by MetricsMiddleware; the threadpool and AsyncSession.run_sync both run handlers in a copy of
+# the request's context, so the engine hooks see the same object
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("fc_request_stats", default=None)
+
+
+def observe_query(engine: str, statement: str, seconds: float) -> None:
+    """Called by the engine hooks in app/database.py after every statement."""
+    queries.inc(engine=engine)
+    query_time.inc(seconds, engine=engine)
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += seconds
+        stats.statements[statement] += 1
+
+
+def _route_label(scope) -> str:
+    """The matched route's template, e.g. ``/api/dishes/{dish_id}``: bounded label cardinality, no ids.
+
+    Routes of an included router may carry only their own part of the path (``/{dish_id}``); the
+    include prefixes are then the part of the request path in front of the longest suffix the route
+    matches.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    path = scope.get("path", "")
+    regex = getattr(route, "path_regex", None)
+    if regex is not None and not regex.match(path):
+        for i, ch in enumerate(path):
+            if ch == "/" and regex.match(path[i:]):
+                return path[:i] + template
+    return template
+
+
+def _check_repeats(method: str, route: str, stats: RequestStats) -> None:
+    threshold = settings.n_plus_one_threshold
+    if threshold <= 0 or not stats.statements:
+        return
+    statement, count = stats.statements.most_common(1)[0]
+    if count > threshold:
+        n_plus_one.inc(method=method, route=route)
+        log.warning(
+            "%s %s ran the same statement %d times (%d queries total), likely N+1: %s",
+            method, route, count, stats.queries, " ".join(statement.split())[:300],
+        )
+
+
+class MetricsMiddleware:
+    """Times requests and collects their SQL; optionally reports it in a Server-Timing header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = {"code": 500}
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if settings.metrics_debug_header:
+                    n = stats.queries
+                    timing = f'db;dur={stats.db_seconds * 1000:.2f};desc="{n} quer{"y" if n == 1 else "ies"}"'
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            elapsed = time.perf_counter() - start
+            method, route = scope["method"], _route_label(scope)
+            http_requests.inc(method=method, route=route, status=str(status["code"]))
+            http_latency.observe(elapsed, method=method, route=route)
+            request_queries.observe(stats.queries, method=method, route=route)
+            request_db_time.observe(stats.db_seconds, method=method, route=route)
+            _check_repeats(method, route, stats)
+
+
+def _pool_lines() -> Iterable[str]:
+    from .database import pool_stats
+
+    pools = pool_stats()
+    for name, key, kind, help in _POOL_SERIES:
+        yield f"# HELP {name} {help}"
+        yield f"# TYPE {name} {kind}"
+        for engine, snapshot in sorted(pools.items()):
+            yield f'{name}{{engine="{_escape(engine)}"}} {_num(snapshot[key])}'
+
+
+def render() -> str:
+    """All metrics in Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    lines.extend(_pool_lines())
+    return "\n".join(lines) + "\n"
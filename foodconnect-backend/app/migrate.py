@@ -0,0 +1,214 @@
+"""Schema setup and migrations: ``python -m app.migrate`` applies pending steps.
+
+The app never runs DDL at boot; run this once per deploy (or via run.sh in development) before
+starting workers. Each step runs once per database, in order, in its own transaction, and is
+recorded in ``schema_migrations``. Steps use checkfirst/IF NOT EXISTS DDL and add the columns and
+indexes that older tables lack, so a database whose tables were auto-created by an older build is
+brought up to the current schema. ``upgrade`` then checks that every model column exists and fails
+loudly if one is missing, rather than leaving workers to fail on their first query.
+
+    python -m app.migrate            # apply pending migrations
+    python -m app.migrate --status   # list applied / pending
+    python -m app.migrate --seed     # also load the dev sample data (app/seed_dev.py)
+"""
+import argparse
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, case, func, inspect, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.orm import Session
+
+from . import database, rating_stats
+from .database import Base
+from .models.dish import Dish
+from .services.search import search_backend
+
+# Every model module, so Base.metadata knows all tables
+from .models import (  # noqa: F401
+    ai_cache,
+    campus,
+    dish,
+    dish_image,
+    dish_neighbor,
+    dish_tag,
+    dish_vector,
+    order,
+    order_item,
+    rating,
+    recipe,
+    session,
+    tag,
+    user,
+)
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("version", String(64), primary_key=True),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+def _initial(conn: Connection) -> None:
+    Base.metadata.create_all(conn)
+    search_backend(conn).ensure_schema(conn)
+
+
+# Indexes for the hot router queries (see the model __table_args__). Fresh databases already get
+# them from 0001's create_all; this adds them to existing tables, which create_all never alters.
+# `python -m bench.plans` checks that the routers' queries use them.
+_HOT_QUERY_INDEXES = (
+    ("dishes", "ix_dishes_available_created_at_id"),
+    ("dishes", "ix_dishes_available_campus_id_created_at_id"),
+    ("orders", "ix_orders_buyer_id_created_at_id"),
+    ("orders", "ix_orders_cook_id_created_at_id"),
+    ("orders", "ix_orders_buyer_id_status_created_at_id"),
+    ("orders", "ix_orders_cook_id_status_created_at_id"),
+    ("order_items", "ix_order_items_order_id"),
+    ("ratings", "ix_ratings_dish_id_created_at_id"),
+    ("ratings", "ix_ratings_user_id_dish_id"),
+    ("dish_images", "ix_dish_images_dish_id_sort_order"),
+    ("dish_tags", "ix_dish_tags_tag_id_dish_id"),
+)
+
+
+def _hot_query_indexes(conn: Connection) -> None:
+    for table, name in _HOT_QUERY_INDEXES:
+        index = next(i for i in Base.metadata.tables[table].indexes if i.name == name)
+        index.create(conn, checkfirst=True)
+    if conn.dialect.name == "sqlite":
+        # Refresh planner statistics so the new indexes are weighed against real row counts
+        conn.exec_driver_sql("ANALYZE")
+
+
+def _add_missing_columns(conn: Connection, table: str, names: Tuple[str, ...]) -> None:
+    """ALTER TABLE ... ADD COLUMN for model columns an existing table lacks. The column is declared
+    as create_all would (type, server default, NOT NULL), so NOT NULL columns need a server_default."""
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    ddl = conn.dialect.ddl_compiler(conn.dialect, None)
+    for name in names:
+        if name not in existing:
+            col = Base.metadata.tables[table].c[name]
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {ddl.get_column_specification(col)}")
+
+
+def _coordinates(conn: Connection) -> None:
+    _add_missing_columns(conn, "dishes", ("latitude", "longitude", "geohash"))
+    _add_missing_columns(conn, "campuses", ("latitude", "longitude"))
+    index = next(i for i in Base.metadata.tables["dishes"].indexes if i.name == "ix_dishes_available_geohash_lat_lon_id")
+    index.create(conn, checkfirst=True)
+
+
+def _recommendations(conn: Connection) -> None:
+    for name in ("dish_vectors", "dish_neighbors"):
+        Base.metadata.tables[name].create(conn, checkfirst=True)
+
+
+def _rating_aggregates(conn: Connection) -> None:
+    # Databases created before the dish rating totals existed get the columns at 0, then the real
+    # totals from the ratings table. rating_avg (0007) is added here too, since repair() writes it.
+    _add_missing_columns(conn, "dishes", ("rating_sum", "rating_count", "rating_avg"))
+    with Session(bind=conn) as db:
+        rating_stats.repair(db)
+
+
+def _model_indexes(conn: Connection) -> None:
+    # Every model index, for tables create_all made before the index was declared (tags' lower(name)).
+    # IF NOT EXISTS rather than checkfirst: SQLite reflection skips expression indexes
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def _rating_avg(conn: Connection) -> None:
+    # Stored average behind min_rating and sort=rating, so both are an index range instead of a
+    # per-row division over every available dish
+    _add_missing_columns(conn, "dishes", ("rating_avg",))
+    conn.execute(
+        update(Dish.__table__).values(
+            rating_avg=case((Dish.rating_count > 0, Dish.rating_sum * 1.0 / Dish.rating_count), else_=0)
+        )
+    )
+    index = next(i for i in Base.metadata.tables["dishes"].indexes if i.name == "ix_dishes_available_rating_avg_id")
+    index.create(conn, checkfirst=True)
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("ANALYZE")
+
+
+# (version, step) in apply order; append new steps, never edit or reorder applied ones
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("0001_initial", _initial),
+    ("0002_hot_query_indexes", _hot_query_indexes),
+    ("0003_coordinates", _coordinates),
+    ("0004_recommendations", _recommendations),
+    ("0005_rating_aggregates", _rating_aggregates),
+    ("0006_model_indexes", _model_indexes),
+    ("0007_rating_avg", _rating_avg),
+]
+
+
+def applied_versions(conn: Connection) -> set:
+    _meta.create_all(conn)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def missing_columns(conn: Connection) -> List[str]:
+    """``table.column`` for every model column the database lacks (empty when in sync)."""
+    insp = inspect(conn)
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in insp.get_columns(table.name)}
+        missing.extend(f"{table.name}.{c.name}" for c in table.c if c.name not in existing)
+    return missing
+
+
+def upgrade(engine=None) -> List[str]:
+    """Apply pending migrations; returns the versions applied by this call. Raises RuntimeError if
+    the schema still lacks model columns afterwards (a model change shipped without its step)."""
+    engine = engine or database.engine
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    applied = []
+    for version, step in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            step(conn)
+            conn.execute(schema_migrations.insert().values(version=version))
+        applied.append(version)
+    with engine.connect() as conn:
+        missing = missing_columns(conn)
+    if missing:
+        raise RuntimeError(f"Schema is missing model columns after migrating: {', '.join(missing)}")
+    return applied
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.migrate", description="Apply database migrations")
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations, change nothing")
+    parser.add_argument("--seed", action="store_true", help="load dev sample data after migrating")
+    args = parser.parse_args()
+
+    if args.status:
+        with database.engine.begin() as conn:
+            done = applied_versions(conn)
+            missing = missing_columns(conn)
+        for version, _ in MIGRATIONS:
+            print(f"{'applied' if version in done else 'pending'}  {version}")
+        if missing:
+            print(f"missing  {', '.join(missing)}")
+        return
+
+    applied = upgrade()
+    print(f"Applied {len(applied)} migration(s){': ' + ', '.join(applied) if applied else ''}")
+    if args.seed:
+        from .seed_dev import ensure_seed
+
+        ensure_seed()
+        print("Seeded dev data")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Text, DateTime, func
+
+from ..database import Base
+
+
+class AICacheEntry(Base):
+    __tablename__ = "ai_cache_entries"
+
+    # sha256 of (model, params, normalized input); see app/services/ai_cache.py
+    key = Column(String(64), primary_key=True)
+    kind = Column(String(32), nullable=False)
+    value_json = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, Text, DateTime, func
+from sqlalchemy import Column, Text, DateTime, func, Float
 from sqlalchemy.dialects.postgresql import UUID
 
 from ..database import Base
@@ -11,4 +11,7 @@ class Campus(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(Text, nullable=False)
     address = Column(Text, nullable=True)
+    # Default pickup point for dishes listed on this campus without their own coordinates
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,9 +1,10 @@
 import uuid
-from sqlalchemy import Column, String, Text, Numeric, ForeignKey, DateTime, func, Boolean, Integer
+from sqlalchemy import Column, String, Text, Numeric, ForeignKey, DateTime, func, Boolean, Integer, Index, Float, event
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
 from ..database import Base
+from ..geo import encode
 
 
 class Dish(Base):
@@ -20,7 +21,35 @@ class Dish(Base):
     prep_time_minutes = Column(Integer, nullable=True)
     pickup_location = Column(Text, nullable=True)
     campus_id = Column(UUID(as_uuid=True), ForeignKey("campuses.id", ondelete="SET NULL"), nullable=True)
+    # Pickup point; geohash is derived from it on insert/update (see app/geo.py)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    geohash = Column(String(12), nullable=True)
+    # Running totals over ratings, maintained by create_rating (see app/rating_stats.py)
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # rating_sum / rating_count, or 0 while unrated (scores are 1-5), stored so it can be indexed
+    rating_avg = Column(Float, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     cook = relationship("User", back_populates="dishes")
+
+    __table_args__ = (
+        # Newest-first feed: (created_at, id) keyset over available dishes
+        Index("ix_dishes_available_created_at_id", "available", "created_at", "id"),
+        # Same feed filtered to one campus
+        Index("ix_dishes_available_campus_id_created_at_id", "available", "campus_id", "created_at", "id"),
+        # ?near=: one (available, geohash prefix range) seek per grid cell, then distance from the
+        # coordinates without touching the table
+        Index("ix_dishes_available_geohash_lat_lon_id", "available", "geohash", "latitude", "longitude", "id"),
+        # sort=rating and min_rating: best first, (rating_avg, id) keyset
+        Index("ix_dishes_available_rating_avg_id", "available", "rating_avg", "id"),
+    )
+
+
+@event.listens_for(Dish, "before_insert")
+@event.listens_for(Dish, "before_update")
+def _set_geohash(mapper, connection, target: Dish) -> None:
+    has_point = target.latitude is not None and target.longitude is not None
+    target.geohash = encode(target.latitude, target.longitude) if has_point else None
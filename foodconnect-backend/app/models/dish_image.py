@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, Text, Integer, ForeignKey
+from sqlalchemy import Column, Text, Integer, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 
 from ..database import Base
@@ -12,3 +12,6 @@ class DishImage(Base):
     dish_id = Column(UUID(as_uuid=True), ForeignKey("dishes.id", ondelete="CASCADE"), nullable=False)
     url = Column(Text, nullable=False)
     sort_order = Column(Integer, default=0)
+
+    # Images for a page of dishes, in display order
+    __table_args__ = (Index("ix_dish_images_dish_id_sort_order", "dish_id", "sort_order"),)
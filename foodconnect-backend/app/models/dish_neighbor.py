@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Float, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from ..database import Base
+
+
+class DishNeighbor(Base):
+    __tablename__ = "dish_neighbors"
+
+    # One entry of dish_id's top-K most similar dishes (see app/recommendations.py)
+    dish_id = Column(UUID(as_uuid=True), ForeignKey("dishes.id", ondelete="CASCADE"), primary_key=True)
+    neighbor_id = Column(UUID(as_uuid=True), ForeignKey("dishes.id", ondelete="CASCADE"), primary_key=True)
+    # Dot product of the two dishes' user-weight columns; score is its cosine: dot / (|dish| * |neighbor|)
+    dot = Column(Float, nullable=False)
+    score = Column(Float, nullable=False)
+
+    __table_args__ = (
+        # For-you: the neighbors of a page of seed dishes, read from the index alone; also the top-K trim
+        Index("ix_dish_neighbors_dish_id_score_neighbor_id", "dish_id", "score", "neighbor_id"),
+        # Rescoring the entries that point at a dish whose norm changed
+        Index("ix_dish_neighbors_neighbor_id", "neighbor_id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey
+from sqlalchemy import Column, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 
 from ..database import Base
@@ -9,3 +9,6 @@ class DishTag(Base):
 
     dish_id = Column(UUID(as_uuid=True), ForeignKey("dishes.id", ondelete="CASCADE"), primary_key=True)
     tag_id = Column(UUID(as_uuid=True), ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+
+    # The primary key only serves lookups by dish; tag filters go tag -> dishes
+    __table_args__ = (Index("ix_dish_tags_tag_id_dish_id", "tag_id", "dish_id"),)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Float, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+
+from ..database import Base
+
+
+class DishVector(Base):
+    __tablename__ = "dish_vectors"
+
+    # Squared norm of the dish's column in the user x dish weight matrix (see app/recommendations.py)
+    dish_id = Column(UUID(as_uuid=True), ForeignKey("dishes.id", ondelete="CASCADE"), primary_key=True)
+    norm_sq = Column(Float, nullable=False)
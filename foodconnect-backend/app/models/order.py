@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, ForeignKey, String, DateTime, func, Numeric, Enum
+from sqlalchemy import Column, ForeignKey, String, DateTime, func, Numeric, Enum, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import enum
@@ -33,3 +33,14 @@ class Order(Base):
 
     buyer = relationship("User", foreign_keys=[buyer_id], back_populates="buyer_orders")
     cook_user = relationship("User", foreign_keys=[cook_id], back_populates="cook_orders")
+    # Load with selectinload(Order.items); lazy="raise" keeps per-row item queries from sneaking back in
+    items = relationship("OrderItem", lazy="raise", passive_deletes=True)
+
+    __table_args__ = (
+        # GET /orders?as=buyer|cook pages newest-first by (created_at, id)
+        Index("ix_orders_buyer_id_created_at_id", "buyer_id", "created_at", "id"),
+        Index("ix_orders_cook_id_created_at_id", "cook_id", "created_at", "id"),
+        # ...and with ?status=
+        Index("ix_orders_buyer_id_status_created_at_id", "buyer_id", "status", "created_at", "id"),
+        Index("ix_orders_cook_id_status_created_at_id", "cook_id", "status", "created_at", "id"),
+    )
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, Integer, Numeric, Text, ForeignKey
+from sqlalchemy import Column, Integer, Numeric, Text, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 
 from ..database import Base
@@ -15,3 +15,6 @@ class OrderItem(Base):
     unit_price = Column(Numeric(10, 2), nullable=False, default=0.00)
     total_price = Column(Numeric(12, 2), nullable=False, default=0.00)
     special_instructions = Column(Text, nullable=True)
+
+    # Items for a page of orders: WHERE order_id IN (...)
+    __table_args__ = (Index("ix_order_items_order_id", "order_id"),)
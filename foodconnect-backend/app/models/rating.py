@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, Integer, Text, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, Text, ForeignKey, DateTime, func, Index
 from sqlalchemy.dialects.postgresql import UUID
 
 from ..database import Base
@@ -14,3 +14,10 @@ class Rating(Base):
     score = Column(Integer, nullable=False)
     comment = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # GET /ratings?dish_id= pages newest-first by (created_at, id); also serves any dish_id lookup
+        Index("ix_ratings_dish_id_created_at_id", "dish_id", "created_at", "id"),
+        # POST /ratings: has this user already rated the dish?
+        Index("ix_ratings_user_id_dish_id", "user_id", "dish_id"),
+    )
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, Text
+from sqlalchemy import Column, Text, Index, func
 from sqlalchemy.dialects.postgresql import UUID
 
 from ..database import Base
@@ -10,3 +10,6 @@ class Tag(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(Text, unique=True, nullable=False)
+
+    # Tag filters match case-insensitively on lower(name)
+    __table_args__ = (Index("ix_tags_name_lower", func.lower(name)),)
@@ -0,0 +1,76 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence, Union
+import uuid
+
+from fastapi import HTTPException, Response
+from sqlalchemy import String, literal, tuple_
+from sqlalchemy.orm import Query
+
+# Response header carrying the opaque token for the next page. Bodies stay plain JSON arrays
+# so existing clients keep working; clients that page pass it back as ?cursor=.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(key: Union[datetime, float], row_id: uuid.UUID) -> str:
+    """Token for the page after the row with this sort key (created_at, or a score) and id."""
+    value = key.isoformat() if isinstance(key, datetime) else float(key)
+    raw = json.dumps([value, row_id.hex], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple[datetime, uuid.UUID]:
+    created, row_id = _decode(token)
+    try:
+        return datetime.fromisoformat(created), row_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_score_cursor(token: str) -> tuple[float, uuid.UUID]:
+    score, row_id = _decode(token)
+    if isinstance(score, bool) or not isinstance(score, (int, float)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return float(score), row_id
+
+
+def _decode(token: str) -> tuple[Any, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        key, row_id = json.loads(raw)
+        return key, uuid.UUID(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _created_bound(query: Query, created_at: datetime):
+    # SQLite stores server_default=now() values as 'YYYY-MM-DD HH:MM:SS' text while the DateTime
+    # bind processor always appends microseconds; compare against the stored form so ties
+    # on created_at fall through to the id column instead of being skipped or repeated.
+    if query.session.get_bind().dialect.name == "sqlite" and created_at.microsecond == 0:
+        return literal(created_at.strftime("%Y-%m-%d %H:%M:%S"), String)
+    return created_at
+
+
+def keyset(query: Query, created_col, id_col, cursor: Optional[str]) -> Query:
+    """Order newest-first by (created_at, id) and, given a cursor, resume strictly after it."""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(created_col, id_col) < tuple_(_created_bound(query, created_at), literal(row_id, id_col.type)))
+    return query.order_by(created_col.desc(), id_col.desc())
+
+
+def score_keyset(query: Query, score_col, id_col, cursor: Optional[str]) -> Query:
+    """Order best first by (score, id) and, given a cursor, resume strictly after it."""
+    if cursor:
+        score, row_id = decode_score_cursor(cursor)
+        query = query.filter(tuple_(score_col, id_col) < tuple_(literal(score, score_col.type), literal(row_id, id_col.type)))
+    return query.order_by(score_col.desc(), id_col.desc())
+
+
+def set_next_cursor(response: Response, rows: Sequence, limit: Optional[int], key: str = "created_at") -> None:
+    """Emit the next-page cursor when the page came back full; ``key`` names the rows' sort attribute."""
+    if limit and len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, key), last.id)
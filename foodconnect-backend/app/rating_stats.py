@@ -0,0 +1,57 @@
+from typing import Iterable, Optional
+import uuid
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from . import database
+from .models.dish import Dish
+from .models.rating import Rating
+
+
+def apply_rating(db: Session, dish_id: uuid.UUID, score: int) -> bool:
+    """Fold one new rating into the dish aggregates. Returns False if the dish does not exist.
+
+    Runs as a single UPDATE in the caller's transaction so concurrent ratings never lose increments.
+    """
+    res = db.execute(
+        update(Dish)
+        .where(Dish.id == dish_id)
+        .values(
+            rating_sum=Dish.rating_sum + score,
+            rating_count=Dish.rating_count + 1,
+            # SET expressions see the row as it was before this UPDATE
+            rating_avg=(Dish.rating_sum + score) * 1.0 / (Dish.rating_count + 1),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return res.rowcount > 0
+
+
+def average(rating_sum: Optional[int], rating_count: Optional[int]) -> float:
+    return float(rating_sum) / rating_count if rating_count else 0.0
+
+
+def repair(db: Session, dish_ids: Optional[Iterable[uuid.UUID]] = None) -> int:
+    """Recompute rating_sum/rating_count/rating_avg from the ratings table. Returns the number of dishes updated."""
+    totals = (
+        select(func.coalesce(func.sum(Rating.score), 0))
+        .where(Rating.dish_id == Dish.id)
+        .scalar_subquery()
+    )
+    counts = select(func.count(Rating.id)).where(Rating.dish_id == Dish.id).scalar_subquery()
+    averages = select(func.coalesce(func.avg(Rating.score * 1.0), 0)).where(Rating.dish_id == Dish.id).scalar_subquery()
+    stmt = update(Dish).values(rating_sum=totals, rating_count=counts, rating_avg=averages)
+    if dish_ids is not None:
+        stmt = stmt.where(Dish.id.in_(list(dish_ids)))
+    res = db.execute(stmt.execution_options(synchronize_session=False))
+    db.commit()
+    return res.rowcount
+
+
+if __name__ == "__main__":
+    db = database.SessionLocal()
+    try:
+        print(f"Repaired rating stats for {repair(db)} dishes")
+    finally:
+        db.close()
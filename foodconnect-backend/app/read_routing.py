@@ -0,0 +1,251 @@
+"""Read-replica routing for GET endpoints.
+
+``get_read_db`` hands read-only handlers a session on one of the FC_READ_REPLICA_URLS engines,
+round-robin. The replica is picked on the session's first statement, so a handler answering from a
+cache never opens a connection. A replica whose connection fails is skipped for
+FC_READ_REPLICA_RETRY_SECONDS and the session moves on to the next one, falling back to the primary
+when none is healthy. Without replicas it behaves exactly like ``get_db``.
+
+Read-your-writes: when a request commits a write, ReadYourWritesMiddleware sets a short-lived
+cookie, and requests carrying it read from the primary until it expires. Replication lag can
+then not hide a client's own order, rating or dish from it.
+"""
+from contextlib import contextmanager
+import contextvars
+from functools import lru_cache
+import itertools
+import threading
+import time
+from typing import Callable, Iterator, List, Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import database
+from .config import get_settings
+
+# Cookie holding the epoch time until which this client reads from the primary
+PRIMARY_UNTIL_COOKIE = "fc_primary_until"
+# Session.info key naming the replica a read session is on
+_REPLICA_INFO = "read_replica"
+
+settings = get_settings()
+
+
+class Replica:
+    def __init__(self, index: int, url: str):
+        self.name = f"replica{index}"
+        self.engine = database.make_engine(url, self.name)
+        self.async_engine = None
+        if settings.async_db:
+            self.async_engine = database.make_async_engine(database.async_url(url), f"{self.name}-async")
+        self.down_until = 0.0
+        for eng in (self.engine, self.async_engine.sync_engine if self.async_engine is not None else None):
+            if eng is not None:
+                event.listen(eng, "handle_error", self._on_error)
+
+    def _on_error(self, context) -> None:
+        # A dropped connection mid-request also takes the replica out of rotation
+        if context.is_disconnect:
+            self.mark_down()
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.down_until
+
+    def mark_down(self) -> None:
+        self.down_until = time.monotonic() + settings.read_replica_retry_seconds
+
+
+class ReplicaSet:
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(i, url) for i, url in enumerate(urls)]
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+
+    def candidates(self) -> List[Replica]:
+        """Healthy replicas, starting at the next one in round-robin order."""
+        if not self.replicas:
+            return []
+        with self._lock:
+            start = next(self._next) % len(self.replicas)
+        now = time.monotonic()
+        ordered = self.replicas[start:] + self.replicas[:start]
+        return [r for r in ordered if r.healthy(now)]
+
+    def stats(self) -> List[dict]:
+        now = time.monotonic()
+        return [{"name": r.name, "healthy": r.healthy(now)} for r in self.replicas]
+
+
+_REPLICA_URLS = [u.strip() for u in settings.read_replica_urls.split(",") if u.strip()]
+
+
+@lru_cache
+def _replica_set() -> ReplicaSet:
+    # Engines are created on the first read, like the primary's (see database.get_engine)
+    return ReplicaSet(_REPLICA_URLS)
+
+
+def replica_stats() -> List[dict]:
+    return _replica_set().stats() if _REPLICA_URLS else []
+
+
+def _sticky(request: Request) -> bool:
+    raw = request.cookies.get(PRIMARY_UNTIL_COOKIE)
+    if not raw:
+        return False
+    try:
+        return float(raw) > time.time()
+    except ValueError:
+        return False
+
+
+class _ReadSession(Session):
+    """Session that picks its replica when it first needs a connection, not when it is opened.
+
+    A handler that answers from a cache (a 304 on If-None-Match, say) then never checks out or
+    pre-pings a replica connection. ``engine_of`` gives the engine to use on a replica (its sync or
+    its async engine's sync facade), ``primary`` the one to fall back to.
+    """
+
+    def __init__(self, engine_of: Callable[[Replica], Engine], primary: Engine, **kw):
+        super().__init__(**kw)
+        self._engine_of = engine_of
+        self._primary = primary
+        self._chosen: Optional[Engine] = None
+
+    def get_bind(self, mapper=None, clause=None, **kw) -> Engine:
+        if self._chosen is None:
+            self._chosen = self._choose()
+        return self._chosen
+
+    def pin_primary(self) -> None:
+        """Read from the primary; only takes effect before the first statement."""
+        if self._chosen is None:
+            self._chosen = self._primary
+
+    def _choose(self) -> Engine:
+        for replica in _replica_set().candidates():
+            engine = self._engine_of(replica)
+            try:
+                # Check out (and pre-ping) before the first statement so a dead replica fails over
+                engine.connect().close()
+            except DBAPIError:
+                replica.mark_down()
+                continue
+            self.info[_REPLICA_INFO] = replica.name
+            return engine
+        return self._primary
+
+
+def _open_read_session(request: Request) -> Session:
+    if not _REPLICA_URLS or _sticky(request):
+        return database.SessionLocal()
+    return _ReadSession(lambda r: r.engine, database.engine, autoflush=False)
+
+
+def get_read_db(request: Request):
+    """Like get_db, but on a healthy read replica unless this client wrote recently."""
+    db = _open_read_session(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def on_replica(db: Session) -> bool:
+    """True when ``db`` came from get_read_db and reads from a replica, which may lag the primary."""
+    return _REPLICA_INFO in db.info
+
+
+@contextmanager
+def primary_session(db: Session) -> Iterator[Session]:
+    """``db`` itself when it reads from the primary, else a short-lived session on the primary.
+
+    For filling process-wide caches: rows a lagging replica returns must not be stored as the
+    current version, where every client (including one that just wrote) would be served them.
+    """
+    if isinstance(db, _ReadSession):
+        # Not yet on a replica: send its first statement to the primary instead
+        db.pin_primary()
+    if not on_replica(db):
+        yield db
+        return
+    if settings.async_db:
+        # Handlers run inside AsyncSession.run_sync; the async engine's sync facade keeps this
+        # session's IO on the async driver too
+        primary = Session(bind=database.async_engine.sync_engine, autoflush=False)
+    else:
+        primary = database.SessionLocal()
+    with primary:
+        yield primary
+
+
+def _open_read_session_async(request: Request) -> AsyncSession:
+    if not _REPLICA_URLS or _sticky(request):
+        return database.AsyncSessionLocal()
+    return AsyncSession(
+        sync_session_class=_ReadSession,
+        engine_of=lambda r: r.async_engine.sync_engine,
+        primary=database.async_engine.sync_engine,
+        autoflush=False,
+    )
+
+
+async def get_read_db_async(request: Request):
+    """Async counterpart of get_read_db, used by routers when FC_ASYNC_DB is on."""
+    db = _open_read_session_async(request)
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+# Per-request flag flipped by the commit hook below; a mutable holder so the write made in the
+# handler's thread (or greenlet) is visible to the middleware that owns the request
+_request_writes: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("request_writes", default=None)
+
+
+def _note_write(_keys: set) -> None:
+    holder = _request_writes.get()
+    if holder is not None:
+        holder["wrote"] = True
+
+
+_mark_write = database.track_committed_writes(lambda obj: (True,), _note_write)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_writes(state) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        _mark_write(state.session, True)
+
+
+class ReadYourWritesMiddleware:
+    """Pin a client to the primary for FC_READ_YOUR_WRITES_SECONDS after a request that committed a write."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        window = settings.read_your_writes_seconds
+        if scope["type"] != "http" or not _REPLICA_URLS or window <= 0:
+            await self.app(scope, receive, send)
+            return
+        holder = {"wrote": False}
+        token = _request_writes.set(holder)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and holder["wrote"]:
+                cookie = f"{PRIMARY_UNTIL_COOKIE}={time.time() + window:.3f}; Max-Age={int(window) + 1}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_writes.reset(token)
@@ -0,0 +1,324 @@
+"""Item-item collaborative filtering behind ``GET /api/dishes/for-you``.
+
+Each user is a sparse row of per-dish weights: the rating score (1-5), or ORDER_WEIGHT for a dish
+they ordered but never rated. Two dishes are similar when the same users weigh them alike, measured
+as the cosine of their columns. ``rebuild`` computes that for the whole matrix with NumPy/SciPy. It
+keeps each dish's top FC_RECOMMENDER_NEIGHBORS neighbors in ``dish_neighbors`` and each column's
+squared norm in ``dish_vectors``.
+
+``record_rating`` and ``record_order`` fold one new rating or order into those tables inside the request's
+transaction, using plain SQL with no NumPy. The user's row changes in one column, so only the
+rated dish's norm and its pairs with the user's other dishes move. Pairs still in the table stay
+exact. A pair that had dropped out of a top-K list comes back with only the dot product gained
+since then, so lists drift until the next full rebuild. Run this periodically (e.g. nightly):
+
+    python -m app.recommendations [--neighbors 20]
+"""
+import argparse
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+import uuid
+
+from sqlalchemy import String, bindparam, case, delete, func, select, type_coerce, update
+from sqlalchemy.orm import Session
+
+from . import database
+from .config import get_settings
+from .models.dish_neighbor import DishNeighbor
+from .models.dish_vector import DishVector
+from .models.order import Order
+from .models.order_item import OrderItem
+from .models.rating import Rating
+
+settings = get_settings()
+
+# Weight of a dish the user ordered but did not rate: a purchase reads as a mild "liked it"
+ORDER_WEIGHT = 3.0
+# A for-you request starts from the user's latest ratings and orders, at most this many of each
+_MAX_SEEDS = 50
+# Disliked dishes (rated below this) do not pull in dishes similar to them
+_MIN_SEED_WEIGHT = 3.0
+# Dense similarity rows computed at once by rebuild; bounds its peak memory
+_BLOCK_BYTES = 64 * 1024 * 1024
+_BATCH = 10_000
+
+_neighbors = DishNeighbor.__table__
+_vectors = DishVector.__table__
+
+
+def user_weights(db: Session, user_id: uuid.UUID, recent: Optional[int] = None) -> Dict[uuid.UUID, float]:
+    """The user's row of the matrix, dish id -> weight. With ``recent``, only the dishes from their
+    latest ``recent`` ratings and ``recent`` orders."""
+    ratings = select(Rating.dish_id, Rating.score).where(Rating.user_id == user_id)
+    orders = select(Order.id).where(Order.buyer_id == user_id)
+    if recent:
+        ratings = ratings.order_by(Rating.created_at.desc()).limit(recent)
+        orders = orders.order_by(Order.created_at.desc(), Order.id.desc()).limit(recent)
+    ordered = (
+        select(OrderItem.dish_id)
+        .where(OrderItem.order_id.in_(orders.scalar_subquery()), OrderItem.dish_id.is_not(None))
+        .distinct()
+    )
+    weights = {dish_id: ORDER_WEIGHT for dish_id in db.execute(ordered).scalars()}
+    weights.update((dish_id, float(score)) for dish_id, score in db.execute(ratings))
+    return weights
+
+
+def for_user(db: Session, user_id: uuid.UUID, limit: int) -> List[Tuple[uuid.UUID, float]]:
+    """Up to ``limit`` (dish id, score) best first, scored as the sum over the user's recent dishes of
+    weight x similarity. Empty when the user has no history or none of it has neighbors yet."""
+    seeds = user_weights(db, user_id, recent=_MAX_SEEDS)
+    liked = {dish_id: w for dish_id, w in seeds.items() if w >= _MIN_SEED_WEIGHT}
+    if not liked:
+        return []
+    # Summed in SQL so only the top rows come back, not every seed's whole neighbor list
+    total = func.sum(DishNeighbor.score * case(liked, value=DishNeighbor.dish_id))
+    rows = db.execute(
+        select(DishNeighbor.neighbor_id, total)
+        .where(DishNeighbor.dish_id.in_(liked), DishNeighbor.neighbor_id.not_in(seeds))
+        .group_by(DishNeighbor.neighbor_id)
+        .order_by(total.desc())
+        .limit(limit)
+    )
+    return [(dish_id, score) for dish_id, score in rows]
+
+
+def _insert(db: Session, table):
+    """The dialect's INSERT, which has ON CONFLICT support."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def _insert_missing(db: Session, table):
+    """INSERT that skips rows whose key a concurrent request has just written."""
+    return _insert(db, table).on_conflict_do_nothing()
+
+
+def record_rating(db: Session, user_id: uuid.UUID, dish_id: uuid.UUID, score: int) -> None:
+    """Fold a new rating into the similarity tables, in the caller's transaction. Call before the
+    Rating row is flushed: the old weight is read from the user's history."""
+    history = user_weights(db, user_id)
+    old = history.pop(dish_id, 0.0)
+    _apply(db, history, dish_id, old, float(score))
+
+
+def record_order(db: Session, user_id: uuid.UUID, dish_ids) -> None:
+    """Fold a new order into the similarity tables, in the caller's transaction. Call before the
+    Order row is flushed. Dishes the user already ordered or rated keep their weight."""
+    history = user_weights(db, user_id)
+    for dish_id in dish_ids:
+        if dish_id not in history:
+            _apply(db, history, dish_id, 0.0, ORDER_WEIGHT)
+            history[dish_id] = ORDER_WEIGHT
+
+
+def _apply(db: Session, history: Dict[uuid.UUID, float], dish_id: uuid.UUID, old: float, weight: float) -> None:
+    """Change one user's weight for ``dish_id`` from ``old`` to ``weight``; ``history`` is the rest of
+    their row."""
+    if old == weight:
+        return
+    # Added as a delta in one statement, so concurrent changes to the same dish all count; the stored
+    # scores were scaled by the norm before ours, i.e. the returned one minus delta. A column never
+    # seen by a rebuild starts from what this user contributes to it.
+    delta = weight * weight - old * old
+    insert = _insert(db, _vectors)
+    new_norm = db.execute(
+        insert.values(dish_id=dish_id, norm_sq=delta)
+        .on_conflict_do_update(
+            index_elements=[_vectors.c.dish_id], set_={"norm_sq": _vectors.c.norm_sq + insert.excluded.norm_sq}
+        )
+        .returning(_vectors.c.norm_sq)
+    ).scalar_one()
+    old_norm = new_norm - delta
+    norms = dict(db.execute(select(DishVector.dish_id, DishVector.norm_sq).where(DishVector.dish_id.in_(history))).all())
+    fresh = {j: w * w for j, w in history.items() if j not in norms}
+    norms.update(fresh)
+    if fresh:
+        db.execute(_insert_missing(db, _vectors), [{"dish_id": d, "norm_sq": n} for d, n in fresh.items()])
+    if new_norm <= 0:
+        return
+
+    # Every stored cosine involving dish_id shrinks or grows with its norm
+    if old_norm > 0:
+        factor = math.sqrt(old_norm / new_norm)
+        for column in (_neighbors.c.dish_id, _neighbors.c.neighbor_id):
+            db.execute(update(_neighbors).where(column == dish_id).values(score=_neighbors.c.score * factor))
+    if not history:
+        return
+
+    # Pairs with the user's other dishes gain (weight - old) * their weight in dot product
+    stored = db.execute(
+        select(_neighbors.c.dish_id, _neighbors.c.neighbor_id, _neighbors.c.dot).where(
+            ((_neighbors.c.dish_id == dish_id) & _neighbors.c.neighbor_id.in_(history))
+            | (_neighbors.c.dish_id.in_(history) & (_neighbors.c.neighbor_id == dish_id))
+        )
+    )
+    dots = {(a, b): dot for a, b, dot in stored}
+    changed, added = [], []
+    for other, w in history.items():
+        gain = (weight - old) * w
+        for pair in ((dish_id, other), (other, dish_id)):
+            dot = dots.get(pair, 0.0) + gain
+            row = {"b_dish": pair[0], "b_neighbor": pair[1], "b_gain": gain, "b_score": dot / math.sqrt(new_norm * norms[other])}
+            if pair in dots:
+                changed.append(row)
+            elif dot > 0:
+                added.append(row)
+    if changed:
+        db.execute(
+            update(_neighbors)
+            .where(_neighbors.c.dish_id == bindparam("b_dish"), _neighbors.c.neighbor_id == bindparam("b_neighbor"))
+            .values(dot=_neighbors.c.dot + bindparam("b_gain"), score=bindparam("b_score")),
+            changed,
+        )
+    if added:
+        db.execute(
+            _insert_missing(db, _neighbors),
+            [{"dish_id": r["b_dish"], "neighbor_id": r["b_neighbor"], "dot": r["b_gain"], "score": r["b_score"]} for r in added],
+        )
+        _trim(db, {r["b_dish"] for r in added})
+
+
+def _trim(db: Session, dish_ids) -> None:
+    """Drop all but the best FC_RECOMMENDER_NEIGHBORS entries of each dish's list."""
+    keep = (
+        select(_neighbors.c.neighbor_id)
+        .where(_neighbors.c.dish_id == bindparam("b_dish"))
+        .order_by(_neighbors.c.score.desc())
+        .limit(settings.recommender_neighbors)
+    )
+    db.execute(
+        delete(_neighbors).where(
+            _neighbors.c.dish_id == bindparam("b_dish"), _neighbors.c.neighbor_id.not_in(keep.scalar_subquery())
+        ),
+        [{"b_dish": d} for d in dish_ids],
+    )
+
+
+def interaction_matrix(users, dishes, weights, shape):
+    """Sparse float32 users x dishes CSR matrix from parallel index/weight arrays. When a (user, dish)
+    pair occurs more than once the last occurrence wins, so pass ratings after orders."""
+    import numpy as np
+    from scipy import sparse
+
+    keys = users.astype(np.int64) * shape[1] + dishes
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    last = np.ones(len(keys), dtype=bool)
+    last[:-1] = keys[1:] != keys[:-1]
+    pick = order[last]
+    return sparse.csr_matrix((weights[pick].astype(np.float32), (users[pick], dishes[pick])), shape=shape)
+
+
+def compute_neighbors(matrix, k: int):
+    """Top-``k`` cosine neighbors of every column of ``matrix`` (users x dishes, CSR).
+
+    Returns (norm_sq, rows, cols, scores): each column's squared norm, then one entry per kept
+    neighbor pair with a positive score. Similarities are computed for a block of dishes at a time
+    and stay sparse; the block is sized so that even fully dense rows fit in about _BLOCK_BYTES.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    n = matrix.shape[1]
+    norm_sq = np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel()
+    inv = np.zeros_like(norm_sq)
+    nonzero = norm_sq > 0
+    inv[nonzero] = 1 / np.sqrt(norm_sq[nonzero])
+    unit = (matrix @ sparse.diags(inv.astype(np.float32))).tocsr()
+    unit_t = unit.T.tocsr()
+    # float32 value + int32 column index per entry
+    block = max(1, _BLOCK_BYTES // (8 * n))
+    rows, cols, scores = [np.empty(0, np.int64)], [np.empty(0, np.int64)], [np.empty(0, np.float32)]
+    for start in range(0, n, block):
+        sims = (unit_t[start:start + block] @ unit).tocoo()
+        keep = (sims.col != sims.row + start) & (sims.data > 0)
+        r, c, s = sims.row[keep], sims.col[keep], sims.data[keep]
+        # Best first within each row, then keep each row's first k. Cosines lie in (0, 1], so one
+        # float key sorts by row and then score, several times faster than a two-key lexsort
+        order = np.argsort(r + (1.0 - s.astype(np.float64)) / 2)
+        r, c, s = r[order], c[order], s[order]
+        top = np.arange(len(r)) - np.searchsorted(r, r) < k
+        rows.append(r[top].astype(np.int64) + start)
+        cols.append(c[top].astype(np.int64))
+        scores.append(s[top])
+    return norm_sq, np.concatenate(rows), np.concatenate(cols), np.concatenate(scores)
+
+
+def _load(conn):
+    """Every interaction as index arrays, plus the user and dish ids the indexes refer to."""
+    import numpy as np
+
+    # Ids come back as stored and only the distinct dish ids are turned into UUIDs afterwards:
+    # converting every row costs more than the queries. A dish ordered twice by the same buyer
+    # repeats here and collapses in interaction_matrix.
+    ordered = conn.execute(
+        select(type_coerce(Order.buyer_id, String), type_coerce(OrderItem.dish_id, String))
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(OrderItem.dish_id.is_not(None))
+    ).all()
+    rated = conn.execute(select(type_coerce(Rating.user_id, String), type_coerce(Rating.dish_id, String), Rating.score)).all()
+    interactions = ordered + rated
+    user_index: Dict[str, int] = {}
+    dish_index: Dict[str, int] = {}
+    n = len(interactions)
+    users = np.fromiter((user_index.setdefault(r[0], len(user_index)) for r in interactions), dtype=np.int64, count=n)
+    dishes = np.fromiter((dish_index.setdefault(r[1], len(dish_index)) for r in interactions), dtype=np.int64, count=n)
+    weights = np.concatenate(
+        [np.full(len(ordered), ORDER_WEIGHT, dtype=np.float32), np.fromiter((r[2] for r in rated), dtype=np.float32, count=len(rated))]
+    )
+    return users, dishes, weights, len(user_index), [uuid.UUID(str(d)) for d in dish_index]
+
+
+def rebuild(conn, neighbors: Optional[int] = None) -> Dict[str, int]:
+    """Recompute dish_vectors and dish_neighbors from every rating and order, in the caller's
+    transaction. Returns the number of rows written to each."""
+    import numpy as np
+
+    users, dishes, weights, n_users, dish_ids = _load(conn)
+    matrix = interaction_matrix(users, dishes, weights, (n_users, len(dish_ids)))
+    norm_sq, rows, cols, scores = compute_neighbors(matrix, neighbors or settings.recommender_neighbors)
+    dots = scores * np.sqrt(norm_sq[rows] * norm_sq[cols])
+    # Written in primary-key order so the inserts append to the table's indexes rather than
+    # touching random pages
+    rank = np.empty(len(dish_ids), dtype=np.int64)
+    rank[sorted(range(len(dish_ids)), key=dish_ids.__getitem__)] = np.arange(len(dish_ids))
+    order = np.lexsort((rank[cols], rank[rows]))
+    rows, cols, dots, scores = rows[order], cols[order], dots[order], scores[order]
+
+    conn.execute(delete(_neighbors))
+    conn.execute(delete(_vectors))
+    vectors = [{"dish_id": d, "norm_sq": float(n)} for d, n in zip(dish_ids, norm_sq.tolist())]
+    for i in range(0, len(vectors), _BATCH):
+        conn.execute(_vectors.insert(), vectors[i:i + _BATCH])
+    entries = zip(rows.tolist(), cols.tolist(), dots.tolist(), scores.tolist())
+    batch = []
+    for r, c, dot, score in entries:
+        batch.append({"dish_id": dish_ids[r], "neighbor_id": dish_ids[c], "dot": dot, "score": score})
+        if len(batch) >= _BATCH:
+            conn.execute(_neighbors.insert(), batch)
+            batch = []
+    if batch:
+        conn.execute(_neighbors.insert(), batch)
+    return {"dish_vectors": len(vectors), "dish_neighbors": len(rows)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.recommendations", description="Rebuild the for-you similarity tables")
+    parser.add_argument("--neighbors", type=int, help="similar dishes kept per dish (default: FC_RECOMMENDER_NEIGHBORS)")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    with database.engine.begin() as conn:
+        written = rebuild(conn, args.neighbors)
+    print(
+        f"Rebuilt recommendations: {written['dish_neighbors']:,} neighbor entries for "
+        f"{written['dish_vectors']:,} dishes in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
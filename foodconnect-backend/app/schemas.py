@@ -13,6 +13,8 @@ class Campus(BaseModel):
     id: uuid.UUID
     name: str
     address: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
@@ -66,6 +68,9 @@ class DishCreate(BaseModel):
     prep_time_minutes: Optional[int] = None
     pickup_location: Optional[str] = None
     campus_id: Optional[uuid.UUID] = None
+    # Pickup point; both or neither. Defaults to the campus's coordinates when it has them
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
     images: List[DishImageIn] = []
     tags: List[str] = []
 
@@ -82,10 +87,14 @@ class DishRead(BaseModel):
     prep_time_minutes: Optional[int] = None
     pickup_location: Optional[str] = None
     campus_id: Optional[uuid.UUID] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     images: List[str] = []
     tags: List[str] = []
     avg_rating: float = 0
     rating_count: int = 0
+    # Metres from the ?near= point; only set on GET /dishes?near=
+    distance_m: Optional[float] = None
     created_at: datetime
 
 
@@ -1,19 +1,130 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+import multiprocessing
+import os
+import threading
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
 from jose import jwt, JWTError
 from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
 
 from .config import get_settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=get_settings().bcrypt_rounds)
 
+# bcrypt is ~250 ms of CPU per call at cost 12. It runs in a dedicated process pool so a login burst
+# uses every core without holding the GIL, and the number of calls queued for it is capped: past
+# the cap, callers get 503 right away instead of queueing behind the storm. Login and signup await
+# the pool (``*_async``), so a queued call holds neither a request thread nor a DB connection.
+_pool: Optional[Executor] = None
+_pool_lock = threading.Lock()
+_pending = 0
+# Starlette's threadpool for sync handlers (AnyIO's default limiter)
+_THREADPOOL_SIZE = 40
 
-def hash_password(p: str) -> str:
+
+def _hash_job(p: str) -> str:
     return pwd_context.hash(p)
 
 
+def _verify_job(p: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(p, hashed)
+
+
+def _get_pool() -> Optional[Executor]:
+    global _pool
+    settings = get_settings()
+    if settings.password_hash_workers == 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.password_hash_workers or os.cpu_count(),
+                # spawn: forking a process that already runs threads (uvicorn, anyio) is unsafe
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_password_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _queue_limit() -> int:
+    """FC_PASSWORD_HASH_MAX_QUEUE, or by default twice the pool size (at least 8); either way below the
+    DB pool and the request threadpool, so even callers that wait on a thread can never occupy all of either."""
+    settings = get_settings()
+    limit = settings.password_hash_max_queue or max(8, 2 * (settings.password_hash_workers or os.cpu_count() or 1))
+    return max(1, min(limit, settings.db_pool_size + settings.db_max_overflow - 1, _THREADPOOL_SIZE - 1))
+
+
+def _admit() -> None:
+    global _pending
+    with _pool_lock:
+        if _pending >= _queue_limit():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-ins in progress, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+
+
+def _release() -> None:
+    global _pending
+    with _pool_lock:
+        _pending -= 1
+
+
+def _run(fn, *args):
+    pool = _get_pool()
+    if pool is None:
+        return fn(*args)
+    _admit()
+    try:
+        return pool.submit(fn, *args).result()
+    finally:
+        _release()
+
+
+async def _run_async(fn, *args):
+    """Like _run, but waits on the event loop: the caller holds no thread while the pool works."""
+    pool = _get_pool()
+    if pool is None:
+        return await run_in_threadpool(fn, *args)
+    _admit()
+    try:
+        return await asyncio.wrap_future(pool.submit(fn, *args))
+    finally:
+        _release()
+
+
+def hash_password(p: str) -> str:
+    return _run(_hash_job, p)
+
+
 def verify_password(p: str, hashed: str) -> bool:
-    return pwd_context.verify(p, hashed)
+    return verify_and_update_password(p, hashed)[0]
+
+
+def verify_and_update_password(p: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Verify ``p``; when the stored hash uses a different bcrypt cost than FC_BCRYPT_ROUNDS, also
+    return a fresh hash to store (rehash-on-login)."""
+    return _run(_verify_job, p, hashed)
+
+
+async def hash_password_async(p: str) -> str:
+    return await _run_async(_hash_job, p)
+
+
+async def verify_and_update_password_async(p: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return await _run_async(_verify_job, p, hashed)
 
 
 def create_access_token(subject: str, expires_minutes: int = 60 * 24 * 7) -> str:
@@ -23,10 +134,14 @@ def create_access_token(subject: str, expires_minutes: int = 60 * 24 * 7) -> str
     return jwt.encode(to_encode, settings.secret_key, algorithm="HS256")
 
 
-def decode_token(token: str) -> Optional[str]:
+def decode_token_claims(token: str) -> Optional[dict]:
     settings = get_settings()
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=["HS256"])
-        return payload.get("sub")
+        return jwt.decode(token, settings.secret_key, algorithms=["HS256"])
     except JWTError:
         return None
+
+
+def decode_token(token: str) -> Optional[str]:
+    payload = decode_token_claims(token)
+    return payload.get("sub") if payload else None
@@ -1,14 +1,17 @@
 from sqlalchemy.orm import Session
-from .database import SessionLocal, Base, engine
+from .database import SessionLocal
+from .migrate import upgrade
 from .models.campus import Campus
 from .models.user import User, UserRole
 from .models.dish import Dish
 from .models.dish_image import DishImage
 from .models.rating import Rating
+from .rating_stats import apply_rating
+from .services.search import search_backend
 
 
 def ensure_seed():
-    Base.metadata.create_all(bind=engine)
+    upgrade()
     db: Session = SessionLocal()
     try:
         if db.query(Campus).count() == 0:
@@ -29,6 +32,9 @@ def ensure_seed():
             db.add(DishImage(dish_id=d1.id, url="https://picsum.photos/seed/spaghetti/600/400", sort_order=0))
             db.add(DishImage(dish_id=d2.id, url="https://picsum.photos/seed/curry/600/400", sort_order=0))
             db.add(Rating(user_id=buyer.id, dish_id=d1.id, score=5, comment="Delicious!"))
+            apply_rating(db, d1.id, 5)
+            for d in (d1, d2):
+                search_backend(db).index_dish(db, d)
         db.commit()
     finally:
         db.close()
@@ -0,0 +1,23 @@
+"""Fast JSON path for hot read endpoints.
+
+Handlers on this path select plain column tuples, shape them into dicts and return
+``json_response(...)``. The bytes come straight from orjson. That skips building DishRead / OrderRead
+objects and FastAPI's second validate-and-serialize pass through ``response_model``. The routes keep
+their ``response_model``, so the OpenAPI schema does not change. The dict shapes must track
+app/schemas.py field for field.
+"""
+from typing import Any, Mapping, Optional
+
+import orjson
+from fastapi import Response
+
+# UTC datetimes as "...Z", the same form pydantic emits
+_OPTIONS = orjson.OPT_UTC_Z
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=_OPTIONS)
+
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None) -> Response:
+    return Response(content=dumps(content), status_code=status_code, media_type="application/json", headers=headers)
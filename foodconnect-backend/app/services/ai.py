@@ -1,11 +1,17 @@
-import base64
-from typing import List, Dict, Any
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Any, Optional, Tuple
 import httpx
 
 from ..config import get_settings
+from ..cache import MISSING
+from ..metrics import ai_latency
+from .ai_cache import cache_key, get_cache, normalize_text
+from .images import PreparedImage
+from .recipe_stream import RecipeStreamParser
 
 GEMINI_MODEL = "gemini-1.5-flash"
-GEMINI_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
 
 
 def _api_key() -> str:
@@ -15,7 +21,145 @@ def _api_key() -> str:
     return settings.google_api_key
 
 
-def suggest_tags_from_text(text: str, max_tags: int = 8) -> List[str]:
+class GeminiClient:
+    """One pooled HTTP/2 connection set to Gemini, shared by all requests in the process.
+
+    Keeping the client alive across requests reuses TCP+TLS sessions; the semaphore caps how many
+    upstream calls are in flight so a burst queues here instead of piling onto Gemini.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.base_url = settings.gemini_base_url.rstrip("/")
+        self.http = httpx.AsyncClient(
+            http2=settings.ai_http2,
+            limits=httpx.Limits(
+                max_connections=settings.ai_max_connections,
+                max_keepalive_connections=settings.ai_max_keepalive_connections,
+                keepalive_expiry=settings.ai_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(settings.ai_timeout, connect=settings.ai_connect_timeout),
+        )
+        self.slots = asyncio.BoundedSemaphore(settings.ai_max_concurrency)
+
+    async def generate(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        url = f"{self.base_url}/models/{GEMINI_MODEL}:generateContent"
+        kwargs = {}
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=get_settings().ai_connect_timeout)
+        async with self.slots:
+            # Timed inside the slot: the upstream's latency, not our own queueing
+            started, outcome = time.perf_counter(), "error"
+            try:
+                r = await self.http.post(url, params={"key": _api_key()}, json=payload, **kwargs)
+                r.raise_for_status()
+                outcome = "ok"
+            finally:
+                ai_latency.observe(time.perf_counter() - started, operation="generate", outcome=outcome)
+        return r.json()
+
+    async def stream(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Yield streamGenerateContent chunks (SSE framing) as they arrive; holds a slot for the whole stream."""
+        url = f"{self.base_url}/models/{GEMINI_MODEL}:streamGenerateContent"
+        kwargs = {}
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=get_settings().ai_connect_timeout)
+        async with self.slots:
+            started, outcome = time.perf_counter(), "error"
+            try:
+                async with self.http.stream("POST", url, params={"key": _api_key(), "alt": "sse"}, json=payload, **kwargs) as r:
+                    r.raise_for_status()
+                    async for line in r.aiter_lines():
+                        if line.startswith("data:"):
+                            yield json.loads(line[5:])
+                outcome = "ok"
+            finally:
+                ai_latency.observe(time.perf_counter() - started, operation="stream", outcome=outcome)
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+
+_client: Optional[GeminiClient] = None
+
+
+async def shutdown() -> None:
+    """Close pooled upstream connections (called from the app lifespan)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> GeminiClient:
+    """Shared client, created on the first AI request so workers that never call Gemini skip it."""
+    global _client
+    if _client is None:
+        _client = GeminiClient()
+    return _client
+
+
+class SingleFlight:
+    """Coalesce identical in-flight upstream calls onto one shared task.
+
+    The first caller for a key starts the call; anyone arriving with the same key before it finishes
+    awaits the same task and gets the same result or exception. Callers await through a shield, so
+    one client disconnecting does not cancel the call for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {"started": self.started, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+
+_inflight = SingleFlight()
+
+
+def coalescing_stats() -> Dict[str, int]:
+    return _inflight.stats()
+
+
+def _first_text(data: Dict[str, Any], default: str) -> str:
+    candidates = data.get("candidates", [])
+    if not candidates:
+        return default
+    return candidates[0].get("content", {}).get("parts", [{}])[0].get("text", default)
+
+
+async def suggest_tags_from_text(text: str, max_tags: int = 8) -> List[str]:
+    """Suggest tags for a description, answering repeats from the two-tier result cache."""
+    key = cache_key("suggest_tags", GEMINI_MODEL, max_tags, normalize_text(text))
+    if not get_settings().ai_cache_enabled:
+        return list(await _inflight.do(key, lambda: _suggest_tags_upstream(text, max_tags)))
+    cache = get_cache()
+    cached = await cache.get(key)
+    if cached is not MISSING:
+        return list(cached)
+
+    async def fetch_and_store() -> List[str]:
+        tags = await _suggest_tags_upstream(text, max_tags)
+        await cache.set(key, "suggest_tags", tags)
+        return tags
+
+    return list(await _inflight.do(key, fetch_and_store))
+
+
+async def _suggest_tags_upstream(text: str, max_tags: int) -> List[str]:
     """Call Gemini text model to suggest short, lowercase tags from description."""
     prompt = (
         "Suggest concise, lowercase tags (1-2 words) for the following food listing. "
@@ -24,19 +168,13 @@ def suggest_tags_from_text(text: str, max_tags: int = 8) -> List[str]:
     payload = {
         "contents": [{"parts": [{"text": prompt}]}]
     }
-    params = {"key": _api_key()}
-    with httpx.Client(timeout=30) as client:
-        r = client.post(GEMINI_URL, params=params, json=payload)
-        r.raise_for_status()
-        data = r.json()
+    data = await get_client().generate(payload, timeout=get_settings().ai_tags_timeout)
     # Extract text
-    candidates = data.get("candidates", [])
-    if not candidates:
+    if not data.get("candidates"):
         return []
-    text_resp = candidates[0].get("content", {}).get("parts", [{}])[0].get("text", "[]")
+    text_resp = _first_text(data, "[]")
     # Try to parse as JSON array
     try:
-        import json
         arr = json.loads(text_resp)
         if isinstance(arr, list):
             # Normalize
@@ -48,8 +186,19 @@ def suggest_tags_from_text(text: str, max_tags: int = 8) -> List[str]:
     return [p for p in parts if p][:max_tags]
 
 
-def recipe_from_pantry(images_base64: List[str], pantry_items: List[str]) -> Dict[str, Any]:
-    """Call Gemini with images + pantry list to propose a recipe. Returns dict with title, ingredients, steps."""
+async def recipe_from_pantry(images: List[PreparedImage], pantry_items: List[str]) -> Dict[str, Any]:
+    """Propose a recipe from pantry photos + items; identical concurrent requests share one upstream call."""
+    key = cache_key(
+        "pantry_recipe",
+        GEMINI_MODEL,
+        sorted(normalize_text(p) for p in pantry_items),
+        sorted(img.sha256 for img in images),
+    )
+    res = await _inflight.do(key, lambda: _recipe_upstream(images, pantry_items))
+    return {"title": res["title"], "ingredients": list(res["ingredients"]), "steps": list(res["steps"])}
+
+
+def _recipe_payload(images: List[PreparedImage], pantry_items: List[str]) -> Dict[str, Any]:
     parts: List[Dict[str, Any]] = []
     # Add instruction
     instruction = (
@@ -60,25 +209,20 @@ def recipe_from_pantry(images_base64: List[str], pantry_items: List[str]) -> Dic
     parts.append({"text": instruction})
     if pantry_items:
         parts.append({"text": "Pantry items (user provided): " + ", ".join(pantry_items)})
-    # Add images as inline_data
-    for b64 in images_base64[:6]:
+    # Add images as inline_data (already sniffed, deduped and downscaled; see services/images.py)
+    for img in images:
         parts.append({
             "inline_data": {
-                "mime_type": "image/jpeg",
-                "data": b64,
+                "mime_type": img.mime_type,
+                "data": img.b64(),
             }
         })
-    payload = {
+    return {
         "contents": [{"parts": parts}]
     }
-    params = {"key": _api_key()}
-    with httpx.Client(timeout=60) as client:
-        r = client.post(GEMINI_URL, params=params, json=payload)
-        r.raise_for_status()
-        data = r.json()
-    candidates = data.get("candidates", [])
-    text_resp = candidates[0].get("content", {}).get("parts", [{}])[0].get("text", "{}") if candidates else "{}"
-    import json
+
+
+def _parse_recipe(text_resp: str, pantry_items: List[str]) -> Dict[str, Any]:
     try:
         obj = json.loads(text_resp)
         title = str(obj.get("title", "AI Recipe")).strip() or "AI Recipe"
@@ -88,3 +232,22 @@ def recipe_from_pantry(images_base64: List[str], pantry_items: List[str]) -> Dic
     except Exception:
         # Fallback into a naive extraction
         return {"title": "AI Recipe", "ingredients": pantry_items or [], "steps": [text_resp]}
+
+
+async def _recipe_upstream(images: List[PreparedImage], pantry_items: List[str]) -> Dict[str, Any]:
+    """Call Gemini with images + pantry list to propose a recipe. Returns dict with title, ingredients, steps."""
+    data = await get_client().generate(_recipe_payload(images, pantry_items), timeout=get_settings().ai_recipe_timeout)
+    return _parse_recipe(_first_text(data, "{}"), pantry_items)
+
+
+async def stream_recipe_from_pantry(
+    images: List[PreparedImage], pantry_items: List[str]
+) -> AsyncIterator[Tuple[str, Any]]:
+    """Stream a pantry recipe: ("title" | "ingredient" | "step", text) events as the model writes them,
+    then ("recipe", dict) parsed from the complete output."""
+    parser = RecipeStreamParser()
+    payload = _recipe_payload(images, pantry_items)
+    async for chunk in get_client().stream(payload, timeout=get_settings().ai_recipe_timeout):
+        for event in parser.feed(_first_text(chunk, "")):
+            yield event
+    yield "recipe", _parse_recipe(parser.text or "{}", pantry_items)
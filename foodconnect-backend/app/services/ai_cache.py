@@ -0,0 +1,148 @@
+import hashlib
+import itertools
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from sqlalchemy import delete, select
+from starlette.concurrency import run_in_threadpool
+
+from .. import database
+from ..cache import LRUCache, MISSING
+from ..config import get_settings
+from ..models.ai_cache import AICacheEntry
+
+log = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt input, so trivially edited reposts share an entry."""
+    return " ".join(text.lower().split())
+
+
+def cache_key(kind: str, model: str, *parts: Any) -> str:
+    raw = json.dumps([kind, model, *parts], separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class TwoTierCache:
+    """In-process LRU (TTL) in front of the ai_cache_entries table, which survives restarts.
+
+    The DB tier is best effort: failures are logged and treated as misses so a cache outage never
+    fails the request that would otherwise have gone upstream. Reads ignore expired rows; every
+    FC_AI_CACHE_SWEEP_EVERY writes they are deleted, so the table stays bounded by the write rate
+    over the TTL.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.memory = LRUCache(settings.ai_cache_max_entries, ttl=settings.ai_cache_ttl_seconds)
+        self.db_ttl = settings.ai_cache_db_ttl_seconds
+        self.sweep_every = settings.ai_cache_sweep_every
+        self.sweep_batch = settings.ai_cache_sweep_batch
+        self._writes = itertools.count(1)
+        self.db_hits = 0
+        self.db_misses = 0
+        self.db_swept = 0
+
+    def _db_get(self, key: str) -> Any:
+        with database.SessionLocal() as db:
+            row = (
+                db.query(AICacheEntry.value_json)
+                .filter(AICacheEntry.key == key, AICacheEntry.expires_at > datetime.now(timezone.utc))
+                .first()
+            )
+        return json.loads(row[0]) if row else MISSING
+
+    def _db_set(self, key: str, kind: str, value: Any) -> None:
+        with database.SessionLocal() as db:
+            db.merge(
+                AICacheEntry(
+                    key=key,
+                    kind=kind,
+                    value_json=json.dumps(value),
+                    expires_at=datetime.now(timezone.utc) + timedelta(seconds=self.db_ttl),
+                )
+            )
+            db.commit()
+
+    def _db_sweep(self) -> int:
+        """Delete expired rows, one short transaction per batch so writers are not blocked for long."""
+        now = datetime.now(timezone.utc)
+        total = 0
+        with database.SessionLocal() as db:
+            while True:
+                batch = select(AICacheEntry.key).where(AICacheEntry.expires_at <= now).limit(self.sweep_batch)
+                n = db.execute(
+                    delete(AICacheEntry).where(AICacheEntry.key.in_(batch)).execution_options(synchronize_session=False)
+                ).rowcount
+                db.commit()
+                total += n
+                if n < self.sweep_batch:
+                    return total
+
+    def _db_purge(self, kind: Optional[str]) -> int:
+        with database.SessionLocal() as db:
+            stmt = delete(AICacheEntry)
+            if kind:
+                stmt = stmt.where(AICacheEntry.kind == kind)
+            n = db.execute(stmt).rowcount
+            db.commit()
+            return n
+
+    async def get(self, key: str) -> Any:
+        value = self.memory.get(key)
+        if value is not MISSING:
+            return value
+        try:
+            value = await run_in_threadpool(self._db_get, key)
+        except Exception:
+            log.warning("ai cache: persistent lookup failed", exc_info=True)
+            value = MISSING
+        if value is MISSING:
+            self.db_misses += 1
+            return MISSING
+        self.db_hits += 1
+        self.memory.set(key, value)
+        return value
+
+    async def set(self, key: str, kind: str, value: Any) -> None:
+        self.memory.set(key, value)
+        try:
+            await run_in_threadpool(self._db_set, key, kind, value)
+        except Exception:
+            log.warning("ai cache: persistent write failed", exc_info=True)
+            return
+        if self.sweep_every > 0 and next(self._writes) % self.sweep_every == 0:
+            try:
+                self.db_swept += await run_in_threadpool(self._db_sweep)
+            except Exception:
+                log.warning("ai cache: expired-entry sweep failed", exc_info=True)
+
+    async def purge(self, kind: Optional[str] = None) -> dict:
+        # Entries are keyed by hash, so a kind-scoped purge drops the whole memory tier too
+        memory = self.memory.clear()
+        persistent = await run_in_threadpool(self._db_purge, kind)
+        return {"memory": memory, "persistent": persistent}
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "persistent": {
+                "hits": self.db_hits,
+                "misses": self.db_misses,
+                "swept": self.db_swept,
+                "ttl_seconds": self.db_ttl,
+            },
+        }
+
+
+_cache: Optional[TwoTierCache] = None
+
+
+def get_cache() -> TwoTierCache:
+    global _cache
+    if _cache is None:
+        _cache = TwoTierCache()
+    return _cache
@@ -0,0 +1,137 @@
+import base64
+import binascii
+import hashlib
+import io
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image, ImageOps
+from starlette.concurrency import run_in_threadpool
+
+from ..config import get_settings
+
+# Formats Pillow can decode and re-encode; anything else Gemini accepts is forwarded untouched
+_DECODABLE = {"image/jpeg", "image/png", "image/webp", "image/gif"}
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    mime_type: str
+    data: bytes
+    # sha256 of the original upload, used for dedup and request coalescing
+    sha256: str
+
+    def b64(self) -> str:
+        return base64.b64encode(self.data).decode()
+
+
+def sniff_mime(head: bytes) -> Optional[str]:
+    """Identify an image by its magic bytes rather than trusting the client's content type."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"mif1", b"msf1", b"heim", b"heis"):
+        return "image/heic"
+    return None
+
+
+def _shrink(data: bytes, mime: str) -> tuple[str, bytes]:
+    """Downscale to the configured max edge and recompress as JPEG. CPU bound; run off the event loop."""
+    settings = get_settings()
+    edge = settings.ai_image_max_edge
+    with Image.open(io.BytesIO(data)) as im:
+        # Checked on the header's dimensions, before draft() below shrinks the decode to near ``edge``
+        if mime == "image/jpeg" and max(im.size) <= edge and len(data) <= settings.ai_image_passthrough_bytes:
+            return mime, data
+        if mime == "image/jpeg":
+            # Let libjpeg decode at 1/2, 1/4 or 1/8 scale: a 12 MP photo never materializes at full size
+            im.draft("RGB", (edge, edge))
+        im = ImageOps.exif_transpose(im)
+        im.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        if im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+        out = io.BytesIO()
+        im.save(out, format="JPEG", quality=settings.ai_image_jpeg_quality, optimize=True)
+    return "image/jpeg", out.getvalue()
+
+
+def _prepare(data: bytes) -> PreparedImage:
+    digest = hashlib.sha256(data).hexdigest()
+    mime = sniff_mime(data[:32])
+    if mime is None:
+        raise HTTPException(status_code=415, detail="Unsupported image format")
+    if mime in _DECODABLE:
+        try:
+            mime, data = _shrink(data, mime)
+        except (OSError, Image.DecompressionBombError):
+            raise HTTPException(status_code=415, detail="Unreadable image")
+    return PreparedImage(mime_type=mime, data=data, sha256=digest)
+
+
+def _check_count(n: int) -> None:
+    limit = get_settings().ai_image_max_count
+    if n > limit:
+        raise HTTPException(status_code=413, detail=f"At most {limit} images per request")
+
+
+def _dedup(blobs: Iterable[bytes]) -> List[bytes]:
+    seen: set[str] = set()
+    unique = []
+    for b in blobs:
+        h = hashlib.sha256(b).hexdigest()
+        if h not in seen:
+            seen.add(h)
+            unique.append(b)
+    return unique
+
+
+async def prepare_images(blobs: List[bytes]) -> List[PreparedImage]:
+    """Sniff, dedupe by content hash, downscale and recompress a batch of raw images."""
+    unique = _dedup(blobs)
+    _check_count(len(unique))
+    return await run_in_threadpool(lambda: [_prepare(b) for b in unique])
+
+
+async def read_uploads(files: List[UploadFile]) -> List[bytes]:
+    """Read multipart parts with per-image and per-request byte limits, stopping at the first overrun."""
+    settings = get_settings()
+    _check_count(len(files))
+    total = 0
+    out = []
+    for f in files:
+        data = await f.read(settings.ai_image_max_bytes + 1)
+        if len(data) > settings.ai_image_max_bytes:
+            raise HTTPException(status_code=413, detail=f"{f.filename or 'image'} exceeds {settings.ai_image_max_bytes} bytes")
+        total += len(data)
+        if total > settings.ai_upload_max_bytes:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds {settings.ai_upload_max_bytes} bytes")
+        out.append(data)
+        await f.close()
+    return out
+
+
+def decode_base64_images(images_base64: List[str]) -> List[bytes]:
+    """Legacy JSON body path: decode base64 images under the same byte limits as multipart uploads."""
+    settings = get_settings()
+    _check_count(len(set(images_base64)))
+    total = 0
+    out = []
+    for b64 in images_base64:
+        # 4 base64 chars carry 3 bytes; reject before decoding anything oversized
+        if len(b64) * 3 // 4 > settings.ai_image_max_bytes + 3:
+            raise HTTPException(status_code=413, detail=f"Image exceeds {settings.ai_image_max_bytes} bytes")
+        try:
+            data = base64.b64decode(b64, validate=False)
+        except (binascii.Error, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid base64 image")
+        total += len(data)
+        if total > settings.ai_upload_max_bytes:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds {settings.ai_upload_max_bytes} bytes")
+        out.append(data)
+    return out
@@ -0,0 +1,82 @@
+import json
+from typing import List, Optional, Tuple
+
+# Top-level array keys whose string items are emitted one by one, and the event name for each item
+_LIST_EVENTS = {"ingredients": "ingredient", "steps": "step"}
+
+
+class RecipeStreamParser:
+    """Incremental scanner for the recipe JSON the model streams back in arbitrary chunks.
+
+    It does not build a document; it tracks just enough structure (container stack, current top-level
+    key, string state) to report each completed ``title`` string and each completed item of the
+    ``ingredients`` / ``steps`` arrays as soon as its closing quote arrives. Text before the first
+    ``{`` (e.g. a ```json fence) is ignored. The full text is still parsed strictly at the end.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._started = False
+        self._stack: List[str] = []
+        self._key: Optional[str] = None
+        self._expect_key = False
+        self._in_string = False
+        self._escape = False
+        self._buf: List[str] = []
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        self.text += chunk
+        events: List[Tuple[str, str]] = []
+        for ch in chunk:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    self._buf.append(ch)
+                elif ch == "\\":
+                    self._escape = True
+                    self._buf.append(ch)
+                elif ch == '"':
+                    self._in_string = False
+                    self._on_string("".join(self._buf), events)
+                else:
+                    self._buf.append(ch)
+                continue
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._stack.append("obj")
+                    self._expect_key = True
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._buf = []
+            elif ch in "{[":
+                self._stack.append("obj" if ch == "{" else "arr")
+                self._expect_key = ch == "{"
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if len(self._stack) == 1:
+                    self._key = None
+                self._expect_key = False
+            elif ch == ",":
+                self._expect_key = bool(self._stack) and self._stack[-1] == "obj"
+            elif ch == ":":
+                self._expect_key = False
+        return events
+
+    def _on_string(self, raw: str, events: List[Tuple[str, str]]) -> None:
+        try:
+            value = json.loads(f'"{raw}"')
+        except ValueError:
+            value = raw
+        depth = len(self._stack)
+        if self._expect_key:
+            if depth == 1:
+                self._key = value
+            self._expect_key = False
+            return
+        if depth == 1 and self._key == "title":
+            events.append(("title", value.strip()))
+        elif depth == 2 and self._stack[-1] == "arr" and self._key in _LIST_EVENTS and value.strip():
+            events.append((_LIST_EVENTS[self._key], value.strip()))
@@ -0,0 +1,133 @@
+import re
+from functools import lru_cache
+from typing import List
+
+from sqlalchemy import Text, column, func, literal_column, table, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Query, Session
+
+from ..models.dish import Dish
+
+
+def _terms(q: str) -> List[str]:
+    """Split a free-text query into lowercase word tokens (drops FTS operators/punctuation)."""
+    return re.findall(r"\w+", q.lower())
+
+
+class LikeSearch:
+    """Fallback for databases without a full-text engine: substring ILIKE, no ranking."""
+
+    def ensure_schema(self, conn: Connection) -> None:
+        pass
+
+    def rebuild(self, conn: Connection) -> None:
+        pass
+
+    def index_dish(self, db: Session, dish: Dish) -> None:
+        pass
+
+    def apply(self, query: Query, q: str) -> Query:
+        like = f"%{q.lower()}%"
+        return query.filter((Dish.title.ilike(like)) | (Dish.description.ilike(like)))
+
+
+class SqliteFtsSearch:
+    """SQLite FTS5 table mirroring dish title/description, ranked by bm25."""
+
+    fts = table(
+        "dishes_fts",
+        column("dish_id", UUID(as_uuid=True)),
+        column("title", Text),
+        column("description", Text),
+    )
+
+    def ensure_schema(self, conn: Connection) -> None:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dishes_fts'")
+        ).first()
+        if exists:
+            return
+        conn.execute(
+            text(
+                "CREATE VIRTUAL TABLE dishes_fts USING fts5("
+                "dish_id UNINDEXED, title, description, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        )
+        # Backfill dishes written before the index existed
+        self.rebuild(conn)
+
+    def rebuild(self, conn: Connection) -> None:
+        """Re-derive the whole index from dishes (after bulk loads that bypass index_dish)."""
+        conn.execute(text("DELETE FROM dishes_fts"))
+        conn.execute(text("INSERT INTO dishes_fts (dish_id, title, description) SELECT id, title, description FROM dishes"))
+
+    def index_dish(self, db: Session, dish: Dish) -> None:
+        db.execute(self.fts.delete().where(self.fts.c.dish_id == dish.id))
+        db.execute(self.fts.insert().values(dish_id=dish.id, title=dish.title, description=dish.description))
+
+    def apply(self, query: Query, q: str) -> Query:
+        terms = _terms(q)
+        if not terms:
+            return query
+        # Quoted tokens with a trailing * give implicit-AND prefix matching
+        match = " ".join(f'"{t}"*' for t in terms)
+        hits = (
+            self.fts.select()
+            .with_only_columns(
+                self.fts.c.dish_id,
+                # Column weights: dish_id (unindexed), title, description
+                func.bm25(literal_column("dishes_fts"), 0.0, 10.0, 1.0).label("rank"),
+            )
+            .where(literal_column("dishes_fts").op("MATCH")(match))
+            .subquery()
+        )
+        # bm25() is lower-is-better
+        return query.join(hits, hits.c.dish_id == Dish.id).order_by(hits.c.rank)
+
+
+class PostgresFtsSearch:
+    """Generated tsvector column on dishes with a GIN index, ranked by ts_rank."""
+
+    search_vector = literal_column("dishes.search_vector")
+
+    def ensure_schema(self, conn: Connection) -> None:
+        conn.execute(
+            text(
+                "ALTER TABLE dishes ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+                "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED"
+            )
+        )
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_dishes_search_vector ON dishes USING GIN (search_vector)"))
+
+    def rebuild(self, conn: Connection) -> None:
+        # Generated column: always current
+        pass
+
+    def index_dish(self, db: Session, dish: Dish) -> None:
+        # search_vector is a generated column; Postgres keeps it in sync on write
+        pass
+
+    def apply(self, query: Query, q: str) -> Query:
+        terms = _terms(q)
+        if not terms:
+            return query
+        tsq = func.to_tsquery("english", " & ".join(f"{t}:*" for t in terms))
+        return query.filter(self.search_vector.op("@@")(tsq)).order_by(func.ts_rank(self.search_vector, tsq).desc())
+
+
+@lru_cache
+def _backend_for(dialect: str):
+    if dialect == "sqlite":
+        return SqliteFtsSearch()
+    if dialect == "postgresql":
+        return PostgresFtsSearch()
+    return LikeSearch()
+
+
+def search_backend(bind):
+    """Return the dish search backend for an engine, connection or session."""
+    if isinstance(bind, Session):
+        bind = bind.get_bind()
+    return _backend_for(bind.dialect.name)
@@ -0,0 +1,15 @@
+"""Load-testing tools for the FoodConnect backend.
+
+    python -m bench.datagen --db sqlite:///./bench.db --scale 1     # bulk synthetic dataset
+    python -m bench.run --db sqlite:///./bench.db --out bench.json  # in-process scenario runner
+    python -m bench.run --db sqlite:///./bench.db --compare bench.json
+    python -m bench.plans --db sqlite:///./bench.db                 # fail on router SQL that reads whole tables
+    python -m bench.queries --db sqlite:///./bench.db               # fail when a list endpoint's query count changes
+    python -m bench.startup                                         # cold start: import, first /healthz, RSS
+    python -m bench.recommend                                       # recommender build time and memory
+    python -m bench.images                                          # pantry photo preprocessing time and RSS
+    python -m bench.oversell                                        # concurrent orders never oversell stock
+
+The database URL is passed on the command line (or FC_DATABASE_URL) and must be set before any
+``app`` module is imported, since settings and engines are read from the environment.
+"""
@@ -0,0 +1,328 @@
+"""Bulk synthetic dataset for benchmarks.
+
+Rows are built in Python and written with Core ``insert()`` + executemany in large batches, bypassing
+the ORM unit of work. Denormalized state the API maintains on write (dish rating totals, stock, the
+search index, the recommendation tables) is computed here or rebuilt once at the end, so the result
+looks like data written through the API. Every user's password is ``BENCH_PASSWORD``.
+
+    python -m bench.datagen --db sqlite:///./bench.db --scale 1 [--seed 42] [--drop]
+    python -m bench.datagen --db sqlite:///./geo.db --dishes 1000000 --campuses 500 --drop
+"""
+import argparse
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+import math
+import os
+import random
+import time
+from typing import Dict, Iterator, List
+import uuid
+
+BENCH_PASSWORD = "benchpass"
+BATCH = 10_000
+# Campuses are scattered over this (lat, lon) box; a campus's dishes lie within DISH_SPREAD_M of it
+_CAMPUS_AREA = ((25.0, 49.0), (-124.0, -67.0))
+DISH_SPREAD_M = 3_000
+
+_WORDS = (
+    "spicy curry vegan pasta creamy garlic noodle ramen tikka masala paneer biryani taco burrito "
+    "quesadilla salsa kimchi bulgogi bibimbap dumpling bao pho banh mi falafel hummus shawarma "
+    "lasagna risotto gnocchi pesto chili lentil chickpea tofu tempeh teriyaki sushi poke salad "
+    "soup stew brownie cookie cake pancake waffle smoothie sandwich burger pizza wrap"
+).split()
+_TAGS = (
+    "vegan vegetarian spicy gluten-free halal kosher dairy-free nut-free keto paleo low-carb "
+    "high-protein comfort street-food breakfast lunch dinner dessert snack indian mexican korean "
+    "japanese thai chinese italian mediterranean american vietnamese homemade quick budget"
+).split()
+
+
+@dataclass
+class Sizes:
+    campuses: int
+    users: int
+    cook_ratio: float
+    dishes: int
+    images_per_dish: int
+    tags: int
+    tags_per_dish: int
+    ratings: int
+    orders: int
+    items_per_order: int
+
+    @classmethod
+    def scaled(cls, scale: float) -> "Sizes":
+        return cls(
+            campuses=max(1, int(10 * scale)),
+            users=max(10, int(5_000 * scale)),
+            cook_ratio=0.1,
+            dishes=max(10, int(20_000 * scale)),
+            images_per_dish=3,
+            tags=min(len(_TAGS) * 8, max(10, int(200 * scale))),
+            tags_per_dish=4,
+            ratings=int(100_000 * scale),
+            orders=int(50_000 * scale),
+            items_per_order=3,
+        )
+
+
+def _batches(rows: Iterator[dict]) -> Iterator[List[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Generator:
+    def __init__(self, sizes: Sizes, seed: int, days: int = 180):
+        self.sizes = sizes
+        self.rng = random.Random(seed)
+        self.now = datetime.now(timezone.utc)
+        self.span = timedelta(days=days).total_seconds()
+        self.counts: Dict[str, int] = defaultdict(int)
+
+    def _id(self) -> uuid.UUID:
+        while True:
+            value = uuid.UUID(int=self.rng.getrandbits(128), version=4)
+            # SQLite gives the UUID column NUMERIC affinity, so a hex form that parses as a number
+            # ("1234e567...", about one id in a million) would be stored as a lossy REAL
+            try:
+                float(value.hex)
+            except ValueError:
+                return value
+
+    def _ts(self) -> datetime:
+        # Nonzero microseconds: SQLite keyset bounds special-case whole-second values (app/pagination.py)
+        ts = self.now - timedelta(seconds=self.rng.random() * self.span)
+        return ts.replace(microsecond=self.rng.randint(1, 999_999))
+
+    def _phrase(self, n: int) -> str:
+        return " ".join(self.rng.choice(_WORDS) for _ in range(n))
+
+    def _point_near(self, lat: float, lon: float, max_m: float) -> tuple:
+        # Uniform over the disc: sqrt keeps the density flat towards the rim
+        r, theta = max_m * math.sqrt(self.rng.random()), self.rng.random() * 2 * math.pi
+        dlat = r * math.cos(theta) / 111_195
+        dlon = r * math.sin(theta) / (111_195 * math.cos(math.radians(lat)))
+        return round(lat + dlat, 6), round(lon + dlon, 6)
+
+    def write(self, conn, table, rows: Iterator[dict]) -> None:
+        for batch in _batches(rows):
+            conn.execute(table.insert(), batch)
+            self.counts[table.name] += len(batch)
+
+    def run(self, conn) -> None:
+        from app.geo import encode
+        from app.models.campus import Campus
+        from app.models.dish import Dish
+        from app.models.dish_image import DishImage
+        from app.models.dish_tag import DishTag
+        from app.models.order import Order, OrderStatus
+        from app.models.order_item import OrderItem
+        from app.models.rating import Rating
+        from app.models.tag import Tag
+        from app.models.user import User, UserRole
+        from app.security import pwd_context
+
+        s, rng = self.sizes, self.rng
+        campus_ids = [self._id() for _ in range(s.campuses)]
+        (lat0, lat1), (lon0, lon1) = _CAMPUS_AREA
+        campus_point = {cid: (round(rng.uniform(lat0, lat1), 6), round(rng.uniform(lon0, lon1), 6)) for cid in campus_ids}
+        self.write(conn, Campus.__table__, (
+            {
+                "id": cid,
+                "name": f"Campus {i}",
+                "address": f"{i} College Ave",
+                "latitude": campus_point[cid][0],
+                "longitude": campus_point[cid][1],
+                "created_at": self._ts(),
+            }
+            for i, cid in enumerate(campus_ids)
+        ))
+
+        # One real hash shared by every user, so the login scenario exercises bcrypt
+        hashed = pwd_context.hash(BENCH_PASSWORD)
+        n_cooks = max(1, int(s.users * s.cook_ratio))
+        user_ids = [self._id() for _ in range(s.users)]
+        cook_ids, buyer_ids = user_ids[:n_cooks], user_ids[n_cooks:] or user_ids
+        user_campus = {uid: rng.choice(campus_ids) for uid in user_ids}
+        self.write(conn, User.__table__, (
+            {
+                "id": uid,
+                "email": f"user{i}@bench.example",
+                "full_name": f"Bench User {i}",
+                "hashed_password": hashed,
+                "role": UserRole.cook if i < n_cooks else UserRole.consumer,
+                "campus_id": user_campus[uid],
+                "created_at": self._ts(),
+            }
+            for i, uid in enumerate(user_ids)
+        ))
+
+        tag_names = []
+        for i in range(s.tags):
+            base = _TAGS[i % len(_TAGS)]
+            tag_names.append(base if i < len(_TAGS) else f"{base}-{i // len(_TAGS)}")
+        tag_ids = [self._id() for _ in tag_names]
+        self.write(conn, Tag.__table__, ({"id": tid, "name": name} for tid, name in zip(tag_ids, tag_names)))
+
+        # Ratings first (in memory) so dish rating totals can be written with the dishes
+        dish_ids = [self._id() for _ in range(s.dishes)]
+        pairs = set()
+        while len(pairs) < min(s.ratings, len(buyer_ids) * len(dish_ids)):
+            pairs.add((rng.randrange(len(buyer_ids)), rng.randrange(len(dish_ids))))
+        scores = {p: rng.choices((1, 2, 3, 4, 5), weights=(1, 1, 3, 5, 6))[0] for p in pairs}
+        rating_sum: Dict[int, int] = defaultdict(int)
+        rating_count: Dict[int, int] = defaultdict(int)
+        for (_, d), score in scores.items():
+            rating_sum[d] += score
+            rating_count[d] += 1
+
+        dish_cook = [rng.choice(cook_ids) for _ in dish_ids]
+        dish_price = [round(rng.uniform(3, 20), 2) for _ in dish_ids]
+        dish_point = [self._point_near(*campus_point[user_campus[cook]], DISH_SPREAD_M) for cook in dish_cook]
+        self.write(conn, Dish.__table__, (
+            {
+                "id": did,
+                "cook_id": dish_cook[i],
+                "title": self._phrase(rng.randint(2, 4)).title(),
+                "description": self._phrase(rng.randint(6, 16)),
+                "price": dish_price[i],
+                "currency": "USD",
+                "available": rng.random() < 0.9,
+                # Most dishes track stock; some are unlimited (None)
+                "available_qty": None if rng.random() < 0.3 else rng.randint(0, 40),
+                "prep_time_minutes": rng.choice((10, 15, 20, 30, 45, 60)),
+                "pickup_location": f"Hall {rng.randint(1, 40)}",
+                "campus_id": user_campus[dish_cook[i]],
+                "latitude": dish_point[i][0],
+                "longitude": dish_point[i][1],
+                # Core inserts skip the ORM hook that derives it
+                "geohash": encode(*dish_point[i]),
+                "rating_sum": rating_sum[i],
+                "rating_count": rating_count[i],
+                "rating_avg": rating_sum[i] / rating_count[i] if rating_count[i] else 0.0,
+                "created_at": self._ts(),
+                "updated_at": self.now,
+            }
+            for i, did in enumerate(dish_ids)
+        ))
+        self.write(conn, DishImage.__table__, (
+            {"id": self._id(), "dish_id": did, "url": f"https://picsum.photos/seed/{did.hex[:12]}-{k}/600/400", "sort_order": k}
+            for did in dish_ids
+            for k in range(rng.randint(1, s.images_per_dish))
+        ))
+        self.write(conn, DishTag.__table__, (
+            {"dish_id": did, "tag_id": tid}
+            for did in dish_ids
+            for tid in rng.sample(tag_ids, rng.randint(1, min(s.tags_per_dish, len(tag_ids))))
+        ))
+        self.write(conn, Rating.__table__, (
+            {
+                "id": self._id(),
+                "user_id": buyer_ids[b],
+                "dish_id": dish_ids[d],
+                "score": score,
+                "comment": self._phrase(rng.randint(3, 10)) if rng.random() < 0.4 else None,
+                "created_at": self._ts(),
+            }
+            for (b, d), score in scores.items()
+        ))
+
+        dishes_by_cook: Dict[uuid.UUID, List[int]] = defaultdict(list)
+        for i, cook in enumerate(dish_cook):
+            dishes_by_cook[cook].append(i)
+        cooks_with_dishes = list(dishes_by_cook)
+        statuses = list(OrderStatus)
+        orders, items = [], []
+        for _ in range(s.orders):
+            cook = rng.choice(cooks_with_dishes)
+            oid = self._id()
+            total = 0.0
+            for d in rng.sample(dishes_by_cook[cook], min(len(dishes_by_cook[cook]), rng.randint(1, s.items_per_order))):
+                qty = rng.randint(1, 3)
+                line = round(qty * dish_price[d], 2)
+                total += line
+                items.append({
+                    "id": self._id(),
+                    "order_id": oid,
+                    "dish_id": dish_ids[d],
+                    "quantity": qty,
+                    "unit_price": dish_price[d],
+                    "total_price": line,
+                    "special_instructions": None,
+                })
+            orders.append({
+                "id": oid,
+                "buyer_id": rng.choice(buyer_ids),
+                "cook_id": cook,
+                "status": rng.choice(statuses),
+                "total": round(total, 2),
+                "currency": "USD",
+                "pickup_location": f"Hall {rng.randint(1, 40)}",
+                "created_at": self._ts(),
+                "updated_at": self.now,
+            })
+        self.write(conn, Order.__table__, iter(orders))
+        self.write(conn, OrderItem.__table__, iter(items))
+
+
+def _fast_load_pragmas(conn) -> None:
+    # Throwaway benchmark data: trade durability for load speed on this connection only
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        conn.exec_driver_sql("PRAGMA temp_store=MEMORY")
+        conn.exec_driver_sql("PRAGMA cache_size=-262144")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.datagen", description="Bulk-load a synthetic dataset")
+    parser.add_argument("--db", help="database URL (default: FC_DATABASE_URL)")
+    parser.add_argument("--scale", type=float, default=1.0, help="1.0 = 20k dishes, 5k users, 100k ratings, 50k orders")
+    parser.add_argument("--users", type=int, help="override the scaled user count")
+    parser.add_argument("--dishes", type=int, help="override the scaled dish count")
+    parser.add_argument("--campuses", type=int, help="override the scaled campus count")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--drop", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args()
+    if args.db:
+        os.environ["FC_DATABASE_URL"] = args.db
+
+    from app import database, recommendations
+    from app.migrate import upgrade
+    from app.services.search import search_backend
+
+    engine = database.engine
+    if args.drop:
+        from sqlalchemy import text
+
+        with engine.begin() as conn:
+            database.Base.metadata.drop_all(conn)
+            conn.execute(text("DROP TABLE IF EXISTS schema_migrations"))
+            if conn.dialect.name == "sqlite":
+                conn.execute(text("DROP TABLE IF EXISTS dishes_fts"))
+    upgrade()
+
+    sizes = Sizes.scaled(args.scale)
+    overrides = {k: v for k, v in (("users", args.users), ("dishes", args.dishes), ("campuses", args.campuses)) if v is not None}
+    gen = Generator(replace(sizes, **overrides), args.seed)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        _fast_load_pragmas(conn)
+        gen.run(conn)
+        search_backend(conn).rebuild(conn)
+        gen.counts.update(recommendations.rebuild(conn))
+    elapsed = time.perf_counter() - started
+    total = sum(gen.counts.values())
+    for name, n in gen.counts.items():
+        print(f"{name:>14}: {n:>10,}")
+    print(f"{total:,} rows in {elapsed:.1f}s ({total / elapsed * 60:,.0f} rows/min)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Pantry photo preprocessing: latency and memory of ``app.services.images`` on phone-sized uploads.
+
+Generates ``--count`` synthetic ``--megapixels`` MP JPEGs (a gradient under sensor-like noise, so they
+compress about as well as real photos), then times ``prepare_images`` on the batch, as the pantry
+endpoints call it. The same batch also goes through a plain full-resolution decode and resize for
+comparison, and as one multipart ``POST /api/ai/pantry-recipe/upload`` through the whole app, with
+Gemini replaced by a local stand-in that answers at once (so the time is this service's share of the
+request). Each mode runs in a fresh process, so its peak RSS covers that mode only; it is printed
+next to the RSS once the photos are loaded, before any decoding. The upload's peak also holds the
+in-process client's copy of the multipart body. No network access or API key needed.
+
+    python -m bench.images [--count 6] [--megapixels 12] [--rounds 3]
+"""
+import argparse
+import asyncio
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import tempfile
+import threading
+import time
+from typing import List, Optional
+
+
+def _rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def synthetic_photo(megapixels: float, seed: int) -> bytes:
+    from PIL import Image
+
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    size = (width, width * 3 // 4)
+    gradient = Image.linear_gradient("L").resize(size)
+    channels = [
+        Image.blend(gradient.rotate(90 * ((seed + i) % 4)).resize(size), Image.effect_noise(size, 40 + 10 * i), 0.3)
+        for i in range(3)
+    ]
+    out = io.BytesIO()
+    Image.merge("RGB", channels).save(out, format="JPEG", quality=92)
+    return out.getvalue()
+
+
+def _write_photo(path: str, megapixels: float, seed: int) -> None:
+    with open(path, "wb") as f:
+        f.write(synthetic_photo(megapixels, seed))
+
+
+def _full_decode(blobs: List[bytes]) -> List[bytes]:
+    """Baseline: decode every photo at full resolution, then resize and recompress."""
+    from PIL import Image, ImageOps
+
+    from app.config import get_settings
+
+    settings = get_settings()
+    out = []
+    for data in blobs:
+        with Image.open(io.BytesIO(data)) as im:
+            im = ImageOps.exif_transpose(im)
+            im.thumbnail((settings.ai_image_max_edge, settings.ai_image_max_edge), Image.Resampling.LANCZOS)
+            buf = io.BytesIO()
+            im.convert("RGB").save(buf, format="JPEG", quality=settings.ai_image_jpeg_quality, optimize=True)
+            out.append(buf.getvalue())
+    return out
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    """Stand-in for Gemini's generateContent: drains the request and answers with a fixed recipe."""
+
+    _BODY = json.dumps(
+        {"candidates": [{"content": {"parts": [{"text": json.dumps({"title": "Bench", "ingredients": ["egg"], "steps": ["cook"]})}]}}]}
+    ).encode()
+    received: List[int] = []
+
+    def do_POST(self) -> None:
+        size = int(self.headers.get("content-length", 0))
+        self.rfile.read(size)
+        self.received.append(size)
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(self._BODY)))
+        self.end_headers()
+        self.wfile.write(self._BODY)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def _upload(blobs: List[bytes], rounds: int, db_path: str, upstream: str):
+    """Post the batch to /api/ai/pantry-recipe/upload ``rounds`` times; (RSS before, timings)."""
+    os.environ.update(FC_DATABASE_URL=f"sqlite:///{db_path}", FC_GEMINI_BASE_URL=upstream, FC_GOOGLE_API_KEY="bench")
+    from fastapi.testclient import TestClient
+
+    from app import database
+    from app.main import app
+    from app.migrate import upgrade
+    from app.models.user import User
+    from app.security import create_access_token
+
+    upgrade()
+    with database.SessionLocal() as db:
+        user = User(email="pantry@bench.local")
+        db.add(user)
+        db.commit()
+        headers = {"Authorization": f"Bearer {create_access_token(str(user.id))}"}
+    files = [("images", (f"{i}.jpg", data, "image/jpeg")) for i, data in enumerate(blobs)]
+    timings = []
+    with TestClient(app) as client:
+        before = _rss_mib()
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            r = client.post("/api/ai/pantry-recipe/upload", files=files, data={"pantry": ["salt"]}, headers=headers)
+            timings.append(time.perf_counter() - t0)
+            r.raise_for_status()
+    return before, timings
+
+
+def _measure(mode: str, paths: List[str], rounds: int, upstream: Optional[str] = None) -> dict:
+    from app.services.images import prepare_images
+
+    blobs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            blobs.append(f.read())
+    if mode == "upload":
+        before, timings = _upload(blobs, rounds, os.path.join(os.path.dirname(paths[0]), "upload.db"), upstream)
+        return {
+            "median_s": statistics.median(timings),
+            "rss_loaded_mib": before,
+            "rss_peak_mib": _rss_mib(),
+            "in_bytes": sum(map(len, blobs)),
+            "out_bytes": None,
+        }
+    before = _rss_mib()
+    timings = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        if mode == "prepare_images":
+            sent = [p.data for p in asyncio.run(prepare_images(blobs))]
+        else:
+            sent = _full_decode(blobs)
+        timings.append(time.perf_counter() - t0)
+    return {
+        "median_s": statistics.median(timings),
+        "rss_loaded_mib": before,
+        "rss_peak_mib": _rss_mib(),
+        "in_bytes": sum(map(len, blobs)),
+        "out_bytes": sum(map(len, sent)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.images", description="Time pantry photo preprocessing")
+    parser.add_argument("--count", type=int, default=6, help="photos per request (the API allows FC_AI_IMAGE_MAX_COUNT)")
+    parser.add_argument("--megapixels", type=float, default=12)
+    parser.add_argument("--rounds", type=int, default=3, help="timed batches per mode; the median is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, f"{i}.jpg") for i in range(args.count)]
+        # spawn: each mode starts from a clean interpreter, so ru_maxrss is that mode's own peak. Linux
+        # carries the peak across fork+exec, so the photos are generated in a worker too, not in this process.
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(1) as pool:
+            pool.starmap(_write_photo, [(path, args.megapixels, i) for i, path in enumerate(paths)])
+        upstream = ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+        threading.Thread(target=upstream.serve_forever, daemon=True).start()
+        upstream_url = f"http://127.0.0.1:{upstream.server_port}/v1beta"
+        for mode in ("prepare_images", "full_decode", "upload"):
+            with ctx.Pool(1) as pool:
+                r = pool.apply(_measure, (mode, paths, args.rounds, upstream_url))
+            if r["out_bytes"] is None:
+                # The JSON request to the model carries the images base64-encoded
+                sent = f"{statistics.median(_Upstream.received) / 2**20:5.2f} MiB request to the model"
+            else:
+                sent = f"{r['out_bytes'] / 2**20:5.2f} MiB to the model"
+            print(
+                f"{mode:>15}  {r['median_s'] * 1000:8.0f} ms / batch   peak RSS {r['rss_peak_mib']:5.0f} MiB "
+                f"({r['rss_loaded_mib']:.0f} with the photos loaded)   "
+                f"{r['in_bytes'] / 2**20:5.1f} MiB in -> {sent}"
+            )
+        upstream.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Oversell stress test: ``--threads`` buyers race to order one portion each of a dish with ``--stock``.
+
+Every round creates a fresh dish with ``--stock`` portions and releases all threads at once through a
+barrier; each thread posts one single-portion order through the ASGI app. The round fails unless
+exactly ``--stock`` orders succeed, the rest get 409, and the dish ends at zero stock and unavailable.
+Reports orders/s (accepted orders over the round's wall time) and exits 1 on any violation. Without
+``--db`` it runs against a fresh SQLite file.
+
+    python -m bench.oversell [--threads 32] [--stock 10] [--rounds 5] [--db sqlite:////tmp/oversell.db]
+"""
+import argparse
+from collections import Counter
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+
+def _setup(threads: int):
+    """A cook and ``threads`` buyers, with a bearer token for each buyer."""
+    from app import database
+    from app.models.user import User, UserRole
+    from app.security import create_access_token
+
+    tag = uuid.uuid4().hex[:8]
+    with database.SessionLocal() as db:
+        cook = User(email=f"oversell-cook-{tag}@bench.local", role=UserRole.cook)
+        buyers = [User(email=f"oversell-{tag}-{i}@bench.local") for i in range(threads)]
+        db.add_all([cook, *buyers])
+        db.commit()
+        return cook.id, [create_access_token(str(b.id)) for b in buyers]
+
+
+def _new_dish(cook_id: uuid.UUID, stock: int) -> uuid.UUID:
+    from app import database
+    from app.models.dish import Dish
+
+    with database.SessionLocal() as db:
+        dish = Dish(cook_id=cook_id, title="Oversell bench", price=5, available=True, available_qty=stock)
+        db.add(dish)
+        db.commit()
+        return dish.id
+
+
+def _round(client, tokens, dish_id: uuid.UUID) -> tuple:
+    barrier = threading.Barrier(len(tokens) + 1)
+    statuses = [None] * len(tokens)
+
+    def buy(i: int) -> None:
+        body = {"items": [{"dish_id": str(dish_id), "quantity": 1}]}
+        headers = {"Authorization": f"Bearer {tokens[i]}"}
+        barrier.wait()
+        try:
+            statuses[i] = client.post("/api/orders/", json=body, headers=headers).status_code
+        except Exception as exc:  # a crashed request is a failed round, not a crashed benchmark
+            statuses[i] = type(exc).__name__
+
+    workers = [threading.Thread(target=buy, args=(i,)) for i in range(len(tokens))]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for w in workers:
+        w.join()
+    return Counter(statuses), time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.oversell", description="Race buyers for limited stock")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--stock", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--db", help="database URL (default: a fresh SQLite file)")
+    args = parser.parse_args()
+    if args.stock > args.threads:
+        parser.error("--stock must not exceed --threads, or nothing is contended")
+
+    tmp = None
+    if args.db is None:
+        tmp = tempfile.TemporaryDirectory()
+        args.db = f"sqlite:///{os.path.join(tmp.name, 'oversell.db')}"
+    os.environ["FC_DATABASE_URL"] = args.db
+
+    from fastapi.testclient import TestClient
+
+    from app import database
+    from app.migrate import upgrade
+    from app.main import app
+    from app.models.dish import Dish
+
+    upgrade()
+    cook_id, tokens = _setup(args.threads)
+    failures = 0
+    rates = []
+    with TestClient(app) as client:
+        for n in range(1, args.rounds + 1):
+            dish_id = _new_dish(cook_id, args.stock)
+            statuses, elapsed = _round(client, tokens, dish_id)
+            with database.SessionLocal() as db:
+                dish = db.get(Dish, dish_id)
+                left, available = dish.available_qty, dish.available
+            ok = statuses[200] == args.stock and statuses[409] == args.threads - args.stock
+            ok = ok and left == 0 and not available
+            failures += not ok
+            rates.append(statuses[200] / elapsed)
+            print(
+                f"round {n}: {statuses[200]:3d} accepted, {statuses[409]:3d} sold out, "
+                f"other {dict((k, v) for k, v in statuses.items() if k not in (200, 409)) or '-'}, "
+                f"stock left {left}, available {available}   {statuses[200] / elapsed:7.1f} orders/s"
+                + ("" if ok else "   OVERSOLD OR LOST ORDERS")
+            )
+    print(f"median {statistics.median(rates):.1f} orders/s with {args.threads} threads racing for {args.stock} portions")
+    if tmp is not None:
+        database.engine.dispose()
+        tmp.cleanup()
+    if failures:
+        sys.exit(f"{failures} of {args.rounds} rounds violated the stock invariant")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Query-plan regression check: no router query may read a whole large table.
+
+Replays every ``bench.run`` scenario a few times against a loaded SQLite database, captures the
+SQL the routers actually send, and runs ``EXPLAIN QUERY PLAN`` on each distinct statement with
+the parameters it was executed with. A plan fails the check when it
+
+- has a plain ``SCAN <table>`` step, unless the table is a small lookup table that is read whole by
+  design (ALLOWED_SCANS);
+- sorts (``USE TEMP B-TREE``) while reading one of LARGE_TABLES, unless that read goes through an
+  index in ALLOWED_SORTS: sorting every matching row costs as much as a scan when the match is broad;
+- walks a whole index (``SCAN ... USING INDEX``) or searches with ``available=?`` as the only bound,
+  and does not get its ORDER BY from that index to stop early, so it reads every (available) row.
+
+Exits 1 on failure.
+
+    python -m bench.plans --db sqlite:///./bench.db [-v]
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+from typing import Dict, List, Tuple
+
+# Read in full on purpose (GET /campuses, /tags); both stay small
+ALLOWED_SCANS = {"campuses", "tags"}
+# Tables that grow with traffic, where a sort over a broad match reads most of the table
+LARGE_TABLES = {"dishes", "orders", "ratings", "order_items"}
+# (table, index) reads whose rows may be sorted: the index bound already limits them to a small set
+ALLOWED_SORTS = {
+    # Dishes fetched by id from a full-text or tag match, then put in relevance / newest-first order
+    ("dishes", "ix_dishes_id"): "rows come from the q or tags match, not the whole table",
+    # for_you seeds: one user's latest ratings and ordered dishes
+    ("ratings", "ix_ratings_user_id_dish_id"): "one user's ratings",
+    ("orders", "ix_orders_buyer_id_created_at_id"): "one user's orders",
+    ("order_items", "ix_order_items_order_id"): "items of one user's orders",
+}
+
+_STEP = re.compile(r"^(SCAN|SEARCH) (\w+)(?: USING (?:COVERING )?INDEX (\w+))?")
+_AVAILABLE_ONLY = re.compile(r"\(available=\?\)$")
+_IN_LIST = re.compile(r"\(\?(?:, \?)*\)")
+
+
+def plan_problems(statement: str, plan: List[Tuple]) -> List[str]:
+    """Why a plan reads too much (empty when fine). Rows are EXPLAIN QUERY PLAN's (id, parent, notused, detail)."""
+    problems = []
+    sorts = any(row[-1].startswith("USE TEMP B-TREE") for row in plan)
+    sorts_order_by = any(row[-1].startswith("USE TEMP B-TREE FOR") and "ORDER BY" in row[-1] for row in plan)
+    for row in plan:
+        detail = row[-1]
+        m = _STEP.match(detail)
+        if not m:
+            continue
+        kind, table, index = m.groups()
+        if kind == "SCAN" and index is None and table not in ALLOWED_SCANS and not detail.startswith(f"SCAN {table} VIRTUAL"):
+            problems.append(f"full scan of {table}")
+        elif table in LARGE_TABLES and sorts and (table, index) not in ALLOWED_SORTS:
+            problems.append(f"sorts rows of {table} read via {index or 'a scan'}")
+        elif (kind == "SCAN" or _AVAILABLE_ONLY.search(detail)) and (sorts_order_by or "ORDER BY" not in statement):
+            if table not in ALLOWED_SCANS and not detail.startswith(f"SCAN {table} VIRTUAL"):
+                problems.append(f"reads every {'available ' if kind == 'SEARCH' else ''}row of {table} via {index}")
+    return problems
+
+
+async def capture(requests: int, seed: int) -> Dict[str, Tuple[str, tuple, List[str]]]:
+    """Distinct statements the scenarios executed: shape -> (statement, parameters, scenario names).
+
+    Statements that differ only in the length of an ``IN (?, ...)`` list share one shape.
+    """
+    import httpx
+    from sqlalchemy import event
+
+    from app import database
+    from app.main import app
+
+    from .run import Fixtures, _run_scenario, scenarios
+
+    seen: Dict[str, Tuple[str, tuple, List[str]]] = {}
+    current = {"name": "prime"}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            return
+        _, _, names = seen.setdefault(_IN_LIST.sub("(?...)", statement), (statement, parameters, []))
+        if current["name"] not in names:
+            names.append(current["name"])
+
+    fx = Fixtures(sample=50, seed=seed)
+    engine = database.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            # Priming also fills the dish detail cache, so its miss path is captured here
+            await fx.prime(client)
+            for i, scenario in enumerate(scenarios(fx)):
+                current["name"] = scenario.name
+                n = max(2, int(requests * scenario.share))
+                await _run_scenario(client, scenario, n, 1, seed + i)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return seen
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.plans", description="Fail on router queries that read whole tables")
+    parser.add_argument("--db", help="SQLite database URL loaded by bench.datagen (default: FC_DATABASE_URL)")
+    parser.add_argument("--requests", type=int, default=5, help="requests per scenario")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every plan, not just failures")
+    args = parser.parse_args()
+    if args.db:
+        os.environ["FC_DATABASE_URL"] = args.db
+    # Plans are captured from the sync engine's SQL
+    os.environ["FC_ASYNC_DB"] = "false"
+
+    from app import database
+    from app.security import shutdown_password_pool
+
+    if database.engine.dialect.name != "sqlite":
+        raise SystemExit("bench.plans reads SQLite's EXPLAIN QUERY PLAN; point --db at a SQLite database")
+    try:
+        seen = asyncio.run(capture(args.requests, args.seed))
+    finally:
+        shutdown_password_pool()
+
+    failures = 0
+    with database.engine.connect() as conn:
+        for shape, (statement, parameters, names) in seen.items():
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            problems = plan_problems(statement, plan)
+            if problems or args.verbose:
+                print(f"[{', '.join(names)}] {'; '.join(problems) if problems else 'ok'}")
+                print("    " + " ".join(shape.split())[:400])
+                for row in plan:
+                    print(f"      {row[-1]}")
+            failures += bool(problems)
+    print(f"{len(seen)} statements checked, {failures} reading more than they return")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Query-count check: every list endpoint runs a fixed number of SQL statements per request.
+
+Replays each list scenario of ``bench.run`` (plus the list endpoints it does not load-test) against a
+database loaded by ``bench.datagen`` and counts the statements with ``database.count_queries``. Each
+request is sent once unmeasured first, so the campus/tag caches are warm. The principal cache is then
+emptied, so authenticated endpoints are counted with their user lookup, as on a worker's first request.
+A count that differs from BUDGETS fails the check: more means a new query (or an N+1 over the page),
+fewer means the budget should be tightened. Exits 1 on failure.
+
+    python -m bench.queries --db sqlite:///./bench.db [-v]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+from typing import Dict, List, Tuple
+
+# Statements per request, including the user lookup of authenticated ones. Pages are 20 rows, so a
+# per-row query would blow these by ~20.
+BUDGETS: Dict[str, int] = {
+    "feed": 3,
+    "feed_page2": 3,
+    "campus_feed": 3,
+    # Candidate points first, then the page's rows
+    "nearby": 4,
+    "search": 3,
+    "tag_filter": 3,
+    "top_rated": 3,
+    "top_rated_page2": 3,
+    "ratings": 1,
+    "tags": 0,
+    "campuses": 0,
+    "my_orders": 3,
+    "cook_orders": 3,
+    "for_you": 7,
+    "users": 1,
+    "my_recipes": 2,
+}
+
+
+async def check(seed: int) -> List[Tuple[str, int, List[str]]]:
+    """(name, statements, statement texts) for every budgeted endpoint."""
+    import httpx
+
+    from app import database
+    from app.deps import invalidate_user
+    from app.main import app
+
+    from .run import Fixtures, Request, scenarios
+
+    fx = Fixtures(sample=50, seed=seed)
+    rng = random.Random(seed)
+    results = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await fx.prime(client)
+        requests = {s.name: s.build(rng) for s in scenarios(fx) if s.name in BUDGETS}
+        requests["users"] = Request("GET", "/api/users/")
+        requests["my_recipes"] = Request("GET", "/api/recipes/me", headers=fx.tokens[fx.buyers[0]])
+        for name, req in requests.items():
+            r = await client.request(req.method, req.url, headers=req.headers)
+            if r.status_code != 200:
+                raise SystemExit(f"{name}: {req.url} answered {r.status_code}")
+            for user_id in fx.tokens:
+                invalidate_user(user_id)
+            with database.count_queries() as counter:
+                await client.request(req.method, req.url, headers=req.headers)
+            results.append((name, counter.count, counter.statements))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.queries", description="Fail when a list endpoint's query count changes")
+    parser.add_argument("--db", help="database URL loaded by bench.datagen (default: FC_DATABASE_URL)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-v", "--verbose", action="store_true", help="print the statements of every endpoint, not just failures")
+    args = parser.parse_args()
+    if args.db:
+        os.environ["FC_DATABASE_URL"] = args.db
+
+    from app.security import shutdown_password_pool
+
+    try:
+        results = asyncio.run(check(args.seed))
+    finally:
+        shutdown_password_pool()
+
+    failures = 0
+    for name, count, statements in results:
+        ok = count == BUDGETS[name]
+        failures += not ok
+        print(f"{name:>16}  {count:3d} statements (budget {BUDGETS[name]}){'' if ok else '  MISMATCH'}")
+        if not ok or args.verbose:
+            for statement in statements:
+                print("    " + " ".join(statement.split())[:200])
+    missing = sorted(set(BUDGETS) - {name for name, _, _ in results})
+    if missing:
+        print(f"Not exercised (no fixture rows): {', '.join(missing)}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Offline recommender build: time and memory of ``app.recommendations`` at catalogue scale.
+
+The default mode needs no database. It generates a synthetic interaction matrix in memory, then
+times the two vectorized stages of ``rebuild`` (matrix assembly and top-K similarity) and reports
+the peak memory they allocate. In the synthetic data each user has a taste cluster that most of
+their dishes come from, popularity inside a cluster is long-tailed, and about half the
+interactions are ratings. ``--db`` instead times a full rebuild of a database loaded by
+``bench.datagen``, including reading interactions and writing the neighbor table.
+
+    python -m bench.recommend [--users 100000] [--dishes 50000] [--per-user 20] [--neighbors 20]
+    python -m bench.recommend --db sqlite:///./bench.db
+"""
+import argparse
+import os
+import resource
+import time
+import tracemalloc
+
+
+def synthetic(users: int, dishes: int, per_user: float, clusters: int, seed: int):
+    """(user, dish, weight) index arrays with ~``per_user`` interactions per user on average."""
+    import numpy as np
+
+    from app.recommendations import ORDER_WEIGHT
+
+    rng = np.random.default_rng(seed)
+    u = np.repeat(np.arange(users), rng.geometric(1 / per_user, size=users))
+    n = len(u)
+    size = max(1, dishes // clusters)
+    taste = rng.integers(0, clusters, size=users)[u]
+    # Long tail inside the cluster: low offsets are its popular dishes
+    offset = np.minimum((rng.pareto(1.2, n) * size / 20).astype(np.int64), size - 1)
+    d = np.where(rng.random(n) < 0.8, np.minimum(taste * size + offset, dishes - 1), rng.integers(0, dishes, n))
+    w = np.where(rng.random(n) < 0.5, rng.integers(1, 6, n), ORDER_WEIGHT).astype(np.float32)
+    return u, d, w
+
+
+def _rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _offline(args) -> None:
+    from app.recommendations import compute_neighbors, interaction_matrix
+
+    u, d, w = synthetic(args.users, args.dishes, args.per_user, args.clusters, args.seed)
+    print(f"{args.users:,} users x {args.dishes:,} dishes, {len(u):,} interactions, k={args.neighbors}")
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    matrix = interaction_matrix(u, d, w, (args.users, args.dishes))
+    t1 = time.perf_counter()
+    norm_sq, rows, _, _ = compute_neighbors(matrix, args.neighbors)
+    t2 = time.perf_counter()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    density = matrix.nnz / (args.users * args.dishes)
+    print(f"matrix            {t1 - t0:8.2f} s   nnz {matrix.nnz:,} (density {density:.2e})")
+    print(f"top-k similarity  {t2 - t1:8.2f} s   {len(rows):,} neighbor entries for {int((norm_sq > 0).sum()):,} dishes")
+    print(f"peak allocated    {peak / 2**20:8.0f} MiB (build stages only)")
+    print(f"max RSS           {_rss_mib():8.0f} MiB (whole process, including the generated data)")
+
+
+def _database(args) -> None:
+    from app import database
+    from app.recommendations import rebuild
+
+    t0 = time.perf_counter()
+    with database.engine.begin() as conn:
+        written = rebuild(conn, args.neighbors)
+    elapsed = time.perf_counter() - t0
+    print(f"rebuild           {elapsed:8.2f} s   {written['dish_neighbors']:,} neighbor entries for {written['dish_vectors']:,} dishes")
+    print(f"max RSS           {_rss_mib():8.0f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.recommend", description="Time the recommender build")
+    parser.add_argument("--db", help="rebuild this database (loaded by bench.datagen) instead of synthetic data")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--dishes", type=int, default=50_000)
+    parser.add_argument("--per-user", type=float, default=20, help="mean interactions per user")
+    parser.add_argument("--clusters", type=int, default=200, help="taste clusters users and dishes fall into")
+    parser.add_argument("--neighbors", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.db:
+        os.environ["FC_DATABASE_URL"] = args.db
+        _database(args)
+    else:
+        _offline(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+"""In-process scenario runner: drives the ASGI app through httpx, no server or network in the loop.
+
+Each scenario issues ``--requests`` requests from ``--concurrency`` concurrent clients against a
+database loaded by ``bench.datagen`` and reports p50/p95/p99 latency and req/s. A scenario can also
+keep a background load running while it is measured (``feed_login_storm``: the feed during a login
+storm), and then reports the background's throughput too. ``feed_offset_p100`` and
+``feed_cursor_p100`` (likewise p1000, next to ``feed_p1``) fetch the same deep feed page by offset
+and by cursor. ``--out`` writes the results as a JSON baseline; ``--compare`` checks a run against
+one and exits 1 when a scenario's p95 or throughput is worse than ``--tolerance`` allows.
+
+    python -m bench.run --db sqlite:///./bench.db --out bench.json
+    python -m bench.run --db sqlite:///./bench.db --compare bench.json [--only feed,dish_detail]
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+# Requests per scenario as a fraction of --requests: login pays for a bcrypt verify by design
+_LOGIN_SHARE = 0.1
+_NEARBY_RADIUS_M = 1_500
+# Clients logging in back to back during feed_login_storm, and how long they run before measuring
+_STORM_CLIENTS = 30
+_BACKGROUND_RAMP_S = 1.0
+# Feed pages compared by offset and by cursor. The page size keeps page 1000 inside a --scale 1
+# dataset (about 18k available dishes).
+_DEPTH_PAGES = (1, 100, 1000)
+_DEPTH_LIMIT = 10
+_QUERIES = ("curry", "spicy noodle", "vegan", "taco", "garlic pasta", "dumpling", "paneer", "soup")
+
+
+@dataclass
+class Request:
+    method: str
+    url: str
+    headers: Optional[dict] = None
+    json: Optional[dict] = None
+
+
+@dataclass
+class Scenario:
+    name: str
+    build: Callable[[random.Random], Request]
+    expect: int = 200
+    share: float = 1.0
+    # Load kept running by its own clients while the measured requests run (e.g. a login storm);
+    # its completed and shed (503) requests are reported alongside
+    background: Optional[Callable[[random.Random], Request]] = None
+    background_clients: int = 0
+
+
+class Fixtures:
+    """IDs, tokens and validators sampled from the loaded dataset, so requests hit real rows."""
+
+    def __init__(self, sample: int, seed: int):
+        from sqlalchemy import func, select
+
+        from app import database
+        from app.models.campus import Campus
+        from app.models.dish import Dish
+        from app.models.order import Order, OrderStatus
+        from app.models.tag import Tag
+        from app.models.user import User
+        from app.pagination import encode_cursor
+        from app.security import create_access_token
+
+        def pick(stmt):
+            return list(db.execute(stmt.order_by(func.random()).limit(sample)).scalars())
+
+        with database.SessionLocal() as db:
+            self.dish_ids = pick(select(Dish.id).where(Dish.available.is_(True)))
+            # Unlimited stock, so the order-placing scenario never runs dishes out
+            self.orderable = list(
+                db.execute(
+                    select(Dish.id, Dish.cook_id)
+                    .where(Dish.available.is_(True), Dish.available_qty.is_(None))
+                    .order_by(func.random())
+                    .limit(sample)
+                )
+            )
+            self.tags = pick(select(Tag.name))
+            self.campus_ids = pick(select(Campus.id))
+            self.campus_points = list(
+                db.execute(
+                    select(Campus.latitude, Campus.longitude)
+                    .where(Campus.latitude.is_not(None), select(Dish.id).where(Dish.campus_id == Campus.id).exists())
+                    .order_by(func.random())
+                    .limit(sample)
+                )
+            )
+            orders = list(db.execute(select(Order.id, Order.buyer_id, Order.cook_id).order_by(func.random()).limit(sample)))
+            # The cursor a client paging from the top would hold when asking for each deeper page
+            self.depth_cursors: Dict[int, str] = {}
+            for page in _DEPTH_PAGES[1:]:
+                last = db.execute(
+                    select(Dish.created_at, Dish.id)
+                    .where(Dish.available.is_(True))
+                    .order_by(Dish.created_at.desc(), Dish.id.desc())
+                    .offset((page - 1) * _DEPTH_LIMIT - 1)
+                    .limit(1)
+                ).first()
+                if last is not None:
+                    self.depth_cursors[page] = encode_cursor(*last)
+            self.emails = pick(select(User.email))
+        if not self.dish_ids or not orders:
+            raise SystemExit("Database looks empty: load it with `python -m bench.datagen` first")
+        self.buyers = sorted({b for _, b, _ in orders}, key=str)
+        self.cooks = sorted({c for _, _, c in orders if c is not None}, key=str)
+        self.tokens = {uid: {"Authorization": f"Bearer {create_access_token(str(uid))}"} for uid in self.buyers + self.cooks}
+        self.orders = [(oid, self.tokens[b]) for oid, b, _ in orders]
+        self.statuses = [s.value for s in OrderStatus]
+        self.etags: Dict[object, str] = {}
+        self.feed_cursor: Optional[str] = None
+        self.top_rated_cursor: Optional[str] = None
+
+    async def prime(self, client) -> None:
+        """Validators and cursors that can only be learned by asking the app."""
+        from app.pagination import NEXT_CURSOR_HEADER
+
+        for dish_id in self.dish_ids[:50]:
+            r = await client.get(f"/api/dishes/{dish_id}")
+            if "etag" in r.headers:
+                self.etags[dish_id] = r.headers["etag"]
+        r = await client.get("/api/dishes/", params={"limit": 20})
+        self.feed_cursor = r.headers.get(NEXT_CURSOR_HEADER)
+        r = await client.get("/api/dishes/", params={"limit": 20, "sort": "rating", "min_rating": 4})
+        self.top_rated_cursor = r.headers.get(NEXT_CURSOR_HEADER)
+
+
+def scenarios(fx: Fixtures) -> List[Scenario]:
+    from .datagen import BENCH_PASSWORD
+
+    def feed(rng):
+        return Request("GET", "/api/dishes/?limit=20")
+
+    def feed_page2(rng):
+        return Request("GET", f"/api/dishes/?limit=20&cursor={fx.feed_cursor}")
+
+    def search(rng):
+        return Request("GET", f"/api/dishes/?limit=20&q={rng.choice(_QUERIES)}")
+
+    def campus_feed(rng):
+        return Request("GET", f"/api/dishes/?limit=20&campus_id={rng.choice(fx.campus_ids)}")
+
+    def nearby(rng):
+        lat, lon = rng.choice(fx.campus_points)
+        return Request("GET", f"/api/dishes/?limit=20&near={lat},{lon}&radius_m={_NEARBY_RADIUS_M}")
+
+    def tag_filter(rng):
+        return Request("GET", f"/api/dishes/?limit=20&tags={rng.choice(fx.tags)}")
+
+    def top_rated(rng):
+        return Request("GET", "/api/dishes/?limit=20&sort=rating&min_rating=4")
+
+    def top_rated_page2(rng):
+        return Request("GET", f"/api/dishes/?limit=20&sort=rating&min_rating=4&cursor={fx.top_rated_cursor}")
+
+    def dish_detail(rng):
+        return Request("GET", f"/api/dishes/{rng.choice(fx.dish_ids)}")
+
+    def dish_revalidate(rng):
+        dish_id = rng.choice(list(fx.etags))
+        return Request("GET", f"/api/dishes/{dish_id}", headers={"If-None-Match": fx.etags[dish_id]})
+
+    def ratings(rng):
+        return Request("GET", f"/api/ratings/?dish_id={rng.choice(fx.dish_ids)}&limit=20")
+
+    def tags(rng):
+        return Request("GET", "/api/tags")
+
+    def campuses(rng):
+        return Request("GET", "/api/campuses")
+
+    def my_orders(rng):
+        return Request("GET", "/api/orders/?limit=20", headers=fx.tokens[rng.choice(fx.buyers)])
+
+    def cook_orders(rng):
+        headers = fx.tokens[rng.choice(fx.cooks)]
+        return Request("GET", f"/api/orders/?as=cook&status={rng.choice(fx.statuses)}&limit=20", headers=headers)
+
+    def for_you(rng):
+        return Request("GET", "/api/dishes/for-you?limit=20", headers=fx.tokens[rng.choice(fx.buyers)])
+
+    def order_detail(rng):
+        order_id, headers = rng.choice(fx.orders)
+        return Request("GET", f"/api/orders/{order_id}", headers=headers)
+
+    def place_order(rng):
+        dish_id, _ = rng.choice(fx.orderable)
+        body = {"items": [{"dish_id": str(dish_id), "quantity": 1}]}
+        return Request("POST", "/api/orders/", headers=fx.tokens[rng.choice(fx.buyers)], json=body)
+
+    def login(rng):
+        return Request("POST", "/api/auth/login", json={"email": rng.choice(fx.emails), "password": BENCH_PASSWORD})
+
+    def page_by_offset(page):
+        return lambda rng: Request("GET", f"/api/dishes/?limit={_DEPTH_LIMIT}&offset={(page - 1) * _DEPTH_LIMIT}")
+
+    def page_by_cursor(page):
+        return lambda rng: Request("GET", f"/api/dishes/?limit={_DEPTH_LIMIT}&cursor={fx.depth_cursors[page]}")
+
+    out = [Scenario("feed", feed)]
+    if fx.feed_cursor:
+        out.append(Scenario("feed_page2", feed_page2))
+    # Deep pages: offset makes the database walk past every earlier row, a cursor seeks straight there
+    out.append(Scenario("feed_p1", page_by_offset(1)))
+    for page in _DEPTH_PAGES[1:]:
+        if page in fx.depth_cursors:
+            out.append(Scenario(f"feed_offset_p{page}", page_by_offset(page)))
+            out.append(Scenario(f"feed_cursor_p{page}", page_by_cursor(page)))
+    if fx.campus_ids:
+        out.append(Scenario("campus_feed", campus_feed))
+    if fx.campus_points:
+        out.append(Scenario("nearby", nearby))
+    out += [
+        Scenario("search", search),
+        Scenario("tag_filter", tag_filter),
+        Scenario("top_rated", top_rated),
+        Scenario("dish_detail", dish_detail),
+    ]
+    if fx.top_rated_cursor:
+        out.append(Scenario("top_rated_page2", top_rated_page2))
+    if fx.etags:
+        out.append(Scenario("dish_revalidate", dish_revalidate, expect=304))
+    out += [
+        Scenario("ratings", ratings),
+        Scenario("tags", tags),
+        Scenario("campuses", campuses),
+        Scenario("my_orders", my_orders),
+        Scenario("for_you", for_you),
+    ]
+    if fx.cooks:
+        out.append(Scenario("cook_orders", cook_orders))
+    out += [Scenario("order_detail", order_detail)]
+    if fx.orderable:
+        out.append(Scenario("place_order", place_order))
+    out.append(Scenario("login", login, share=_LOGIN_SHARE))
+    # The feed while a crowd keeps logging in: bcrypt must not starve unrelated requests of
+    # threads or DB connections
+    out.append(Scenario("feed_login_storm", feed, background=login, background_clients=_STORM_CLIENTS))
+    return out
+
+
+def _percentile(cuts: List[float], p: int) -> float:
+    return round(cuts[p - 1] * 1000, 2)
+
+
+async def _background(client, build: Callable[[random.Random], Request], seed: int, counts: dict, stop: asyncio.Event) -> None:
+    rng = random.Random(seed)
+    while not stop.is_set():
+        req = build(rng)
+        r = await client.request(req.method, req.url, headers=req.headers, json=req.json)
+        if r.status_code == 503:
+            counts["shed"] += 1
+            # Back off as told, like a well-behaved client
+            try:
+                await asyncio.wait_for(stop.wait(), float(r.headers.get("retry-after", 1)))
+            except asyncio.TimeoutError:
+                pass
+        else:
+            counts["ok" if r.status_code < 400 else "errors"] += 1
+
+
+async def _run_scenario(client, scenario: Scenario, n: int, concurrency: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    plan = [scenario.build(rng) for _ in range(n)]
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+    stop = asyncio.Event()
+    counts = {"ok": 0, "shed": 0, "errors": 0}
+    background = [
+        asyncio.create_task(_background(client, scenario.background, seed + 1000 + i, counts, stop))
+        for i in range(scenario.background_clients if scenario.background else 0)
+    ]
+    if background:
+        # Let the storm build up before measuring
+        await asyncio.sleep(_BACKGROUND_RAMP_S)
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < len(plan):
+            req = plan[next_index]
+            next_index += 1
+            t0 = time.perf_counter()
+            r = await client.request(req.method, req.url, headers=req.headers, json=req.json)
+            latencies.append(time.perf_counter() - t0)
+            if r.status_code != scenario.expect:
+                errors += 1
+
+    started = time.perf_counter()
+    bg_before = dict(counts)
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    bg = {k: counts[k] - bg_before[k] for k in counts}
+    stop.set()
+    await asyncio.gather(*background)
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    extra = {}
+    if background:
+        extra = {"background_rps": round(bg["ok"] / elapsed, 1), "background_shed": bg["shed"], "background_errors": bg["errors"]}
+    return {
+        "requests": n,
+        "errors": errors,
+        "rps": round(n / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "p50_ms": _percentile(cuts, 50),
+        "p95_ms": _percentile(cuts, 95),
+        "p99_ms": _percentile(cuts, 99),
+        "max_ms": round(max(latencies) * 1000, 2),
+        **extra,
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+
+    from app.main import app
+
+    fx = Fixtures(args.sample, args.seed)
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await fx.prime(client)
+        selected = [s for s in scenarios(fx) if not args.only or s.name in args.only]
+        for i, scenario in enumerate(selected):
+            n = max(2, int(args.requests * scenario.share))
+            # Warm caches and pools so the first measured requests aren't cold-path outliers
+            await _run_scenario(client, scenario, min(n, args.warmup), args.concurrency, args.seed + i)
+            results[scenario.name] = await _run_scenario(client, scenario, n, args.concurrency, args.seed + i)
+            r = results[scenario.name]
+            line = (
+                f"{scenario.name:>17}  {r['rps']:>8.1f} req/s  p50 {r['p50_ms']:>7.2f}  "
+                f"p95 {r['p95_ms']:>7.2f}  p99 {r['p99_ms']:>7.2f} ms  errors {r['errors']}"
+            )
+            if "background_rps" in r:
+                line += f"  | background {r['background_rps']:.1f} req/s, shed {r['background_shed']}, errors {r['background_errors']}"
+            print(line)
+    return results
+
+
+def _meta(args) -> dict:
+    from app import database
+    from app.config import get_settings
+
+    settings = get_settings()
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": database.engine.dialect.name,
+        "async_db": settings.async_db,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "seed": args.seed,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Scenarios slower than the baseline by more than ``tolerance`` on p95 or req/s."""
+    regressions = []
+    for name, old in baseline.get("results", {}).items():
+        new = results.get(name)
+        if new is None:
+            continue
+        p95 = new["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0.0
+        rps = new["rps"] / old["rps"] - 1 if old["rps"] else 0.0
+        flag = p95 > tolerance or rps < -tolerance or new["errors"] > old["errors"]
+        print(f"{name:>17}  p95 {p95:+7.1%}  req/s {rps:+7.1%}{'  REGRESSION' if flag else ''}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.run", description="Run API load scenarios in-process")
+    parser.add_argument("--db", help="database URL (default: FC_DATABASE_URL)")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario")
+    parser.add_argument("--sample", type=int, default=200, help="rows sampled per fixture kind")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", type=lambda v: set(v.split(",")), help="comma-separated scenario names")
+    parser.add_argument("--out", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95/req/s slowdown (0.2 = 20%%)")
+    args = parser.parse_args()
+    if args.db:
+        os.environ["FC_DATABASE_URL"] = args.db
+
+    from app.security import shutdown_password_pool
+
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        shutdown_password_pool()
+    report = {"meta": _meta(args), "results": results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Wrote {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
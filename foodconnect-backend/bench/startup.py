@@ -0,0 +1,46 @@
+"""Worker cold start: time to import the app, time to answer the first /healthz, and resident memory.
+
+Each run is a fresh interpreter, as a new worker would be; the first run is dropped (disk cache warm-up)
+and medians are reported.
+
+    python -m bench.startup [--runs 7] [--db sqlite:////tmp/startup.db]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+_PROBE = r"""
+import resource, sys, time
+from fastapi.testclient import TestClient  # the probe's own cost, not the app's
+t0 = time.perf_counter()
+from app.main import app
+t1 = time.perf_counter()
+with TestClient(app) as client:
+    assert client.get("/healthz").status_code == 200
+t2 = time.perf_counter()
+print((t1 - t0) * 1000, (t2 - t0) * 1000, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024)
+"""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.startup", description="Measure worker cold start")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--db", default="sqlite:////tmp/fc-startup.db")
+    args = parser.parse_args()
+
+    env = dict(os.environ, FC_DATABASE_URL=args.db)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = []
+    for _ in range(args.runs + 1):
+        out = subprocess.run([sys.executable, "-c", _PROBE], cwd=root, env=env, capture_output=True, text=True, check=True)
+        samples.append([float(v) for v in out.stdout.split()])
+    samples = samples[1:]
+    print(f"import app.main   {statistics.median(s[0] for s in samples):8.1f} ms")
+    print(f"first /healthz    {statistics.median(s[1] for s in samples):8.1f} ms")
+    print(f"max RSS           {statistics.median(s[2] for s in samples):8.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,9 @@ export PYTHONPATH="$PYTHONPATH:$(pwd)"
 # Default port can be overridden: PORT=8000 ./run.sh
 PORT=${PORT:-8000}
 
+# Schema is not created at boot; apply pending migrations first
+python -m app.migrate
+
 exec uvicorn app.main:app \
   --host 0.0.0.0 \
   --port "$PORT" \